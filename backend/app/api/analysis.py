@@ -3,18 +3,34 @@ Analysis API Endpoints
 Handles analysis requests from frontend
 """
 
-from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 import pandas as pd
-import io
+import aiofiles
+import hashlib
+import math
 import os
 import uuid
-from typing import Optional
-from app.core.database import get_db
+from typing import List, Optional, Tuple, Union
+from app.core.database import get_db, get_async_db, SessionLocal
 from app.core.sampling import SamplingMethods
-from app.core.performance import PerformanceMetrics
+from app.core.performance import PerformanceMetrics, ColumnMoments, measure_resources
+from app.core.streaming import StreamingSampling
+from app.core.parallel import COMBINED_METHODS, combined_evaluation, evaluate_method
+from app.core.storage import DatasetStore
+from app.core.cache import dataset_cache
+from app.core.results import RESULT_CACHE_HEADER, result_cache, result_key
+from app.core.jobs import job_manager, JobQueueFullError
+from app.core.experiments import save_experiments, experiment_record
+from app.core.sweep import SWEEP_METHODS, parameter_sweep, summarize_sweep
+from app.core.bootstrap import BOOTSTRAP_METHODS, bootstrap_accuracy
+from app.core import spark
+from app.core.spark import ENGINES, spark_available
 from app.schemas.schemas import AnalysisResponse, CombinedAnalysisResponse
-from app.models.models import Dataset, Experiment, AccuracyResult, SamplingMethod
+from app.models.models import Dataset, ColumnStatistic
 from app.core.config import settings
 
 router = APIRouter()
@@ -23,303 +39,693 @@ router = APIRouter()
 async def upload_dataset(
     file: UploadFile = File(...),
     name: str = "Uploaded Dataset",
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     Upload a CSV or JSON file for analysis
+    
+    Uploads are hashed as they stream in; content that is already stored
+    (same bytes and format) links to the existing files and statistics
+    instead of being ingested again, and the response has deduplicated=true.
     """
     try:
         # Validate file extension
-        if not file.filename.endswith(('.csv', '.json')):
-            raise HTTPException(status_code=400, detail="Only CSV and JSON files are supported")
+        if not file.filename.endswith(('.csv', '.json', '.jsonl', '.ndjson')):
+            raise HTTPException(status_code=400, detail="Only CSV, JSON and JSON Lines files are supported")
         
         # Create uploads directory if not exists
         os.makedirs(settings.UPLOAD_DIR, exist_ok=True)
         
-        # Read file
-        contents = await file.read()
-        
-        # Parse based on file type
-        if file.filename.endswith('.csv'):
-            df = pd.read_csv(io.BytesIO(contents))
-        else:  # JSON
-            df = pd.read_json(io.BytesIO(contents))
-        
-        # Validate dataframe
-        if df.empty:
-            raise HTTPException(status_code=400, detail="Dataset is empty")
-        
-        # Save file
+        # Stream the upload to disk in fixed-size chunks
         file_id = str(uuid.uuid4())
         file_path = os.path.join(settings.UPLOAD_DIR, f"{file_id}_{file.filename}")
+        file_size, content_hash = await _save_upload(file, file_path)
         
-        with open(file_path, 'wb') as f:
-            f.write(contents)
+        # Identical content already stored: link to its files instead of re-ingesting
+        stored = await _stored_duplicate(db, content_hash, file_path)
+        if stored is not None:
+            DatasetStore.remove(file_path)
+            return await _link_duplicate(db, stored, name)
+        
+        # Profile the stored file chunk by chunk and write its columnar copy
+        try:
+            profile = await run_in_threadpool(DatasetStore.ingest, file_path)
+        except Exception:
+            DatasetStore.remove(file_path)
+            raise
+        
+        # Validate dataset
+        if profile["size_rows"] == 0 or not profile["column_names"]:
+            DatasetStore.remove(file_path)
+            raise HTTPException(status_code=400, detail="Dataset is empty")
         
         # Calculate file size
-        size_mb = len(contents) / (1024 * 1024)
+        size_mb = file_size / (1024 * 1024)
         
         # Create dataset record
         dataset = Dataset(
             name=name,
             file_path=file_path,
-            size_rows=len(df),
-            size_mb=size_mb
+            size_rows=profile["size_rows"],
+            size_mb=size_mb,
+            content_hash=content_hash
         )
         db.add(dataset)
-        db.commit()
-        db.refresh(dataset)
+        await db.flush()
+        _store_column_statistics(db, dataset.id, profile["column_stats"])
+        await db.commit()
         
         return {
             "id": dataset.id,
             "name": dataset.name,
             "size_rows": dataset.size_rows,
             "size_mb": round(dataset.size_mb, 2),
-            "column_names": df.columns.tolist(),
-            "data_types": df.dtypes.astype(str).to_dict()
+            "column_names": profile["column_names"],
+            "data_types": profile["data_types"],
+            "memory_usage": _memory_usage(profile["memory_bytes"]),
+            "deduplicated": False
         }
     
     except HTTPException:
         raise
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="Dataset is empty")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error uploading file: {str(e)}")
 
 
+def _memory_usage(memory_bytes: dict) -> dict:
+    """In-memory size of the dataset with default and with the stored compact dtypes"""
+    mb = 1024 * 1024
+    default, compact = memory_bytes["default"], memory_bytes["compact"]
+    return {
+        "default_mb": round(default / mb, 2),
+        "compact_mb": round(compact / mb, 2),
+        "saved_mb": round((default - compact) / mb, 2),
+        "saved_percent": round(100 * (default - compact) / default, 2) if default else 0.0
+    }
+
+
+async def _stored_duplicate(db: AsyncSession, content_hash: str, file_path: str) -> Optional[Dataset]:
+    """
+    An existing dataset whose stored file has the same content and format
+    as the upload at file_path, if any
+    """
+    extension = os.path.splitext(file_path)[1]
+    candidates = await db.scalars(
+        select(Dataset).where(Dataset.content_hash == content_hash).order_by(Dataset.id)
+    )
+    for dataset in candidates:
+        if (os.path.splitext(dataset.file_path)[1] == extension and os.path.exists(dataset.file_path)
+                and DatasetStore.has_columnar(dataset.file_path)):
+            return dataset
+    return None
+
+
+async def _link_duplicate(db: AsyncSession, stored: Dataset, name: str) -> dict:
+    """
+    Create a dataset sharing stored's files and copying its column
+    statistics; the columnar copy and cluster layouts are reused as they are
+    """
+    description = await run_in_threadpool(DatasetStore.describe, stored.file_path)
+    dataset = Dataset(
+        name=name,
+        file_path=stored.file_path,
+        size_rows=stored.size_rows,
+        size_mb=stored.size_mb,
+        content_hash=stored.content_hash
+    )
+    db.add(dataset)
+    await db.flush()
+    statistics = await db.scalars(
+        select(ColumnStatistic).where(ColumnStatistic.dataset_id == stored.id).order_by(ColumnStatistic.id)
+    )
+    db.add_all([
+        ColumnStatistic(
+            dataset_id=dataset.id,
+            column_name=row.column_name,
+            count=row.count,
+            null_count=row.null_count,
+            mean=row.mean,
+            variance=row.variance,
+            min_value=row.min_value,
+            max_value=row.max_value
+        )
+        for row in statistics
+    ])
+    await db.commit()
+    
+    return {
+        "id": dataset.id,
+        "name": dataset.name,
+        "size_rows": dataset.size_rows,
+        "size_mb": round(dataset.size_mb, 2),
+        "column_names": description["column_names"],
+        "data_types": description["data_types"],
+        "memory_usage": None,
+        "deduplicated": True
+    }
+
+
+async def _save_upload(file: UploadFile, file_path: str) -> Tuple[int, str]:
+    """
+    Copy an upload to file_path in UPLOAD_CHUNK_SIZE pieces, enforcing
+    MAX_FILE_SIZE and hashing the content as bytes arrive
+
+    Returns:
+        Tuple of (bytes written, SHA-256 hex digest)
+    """
+    size = 0
+    digest = hashlib.sha256()
+    try:
+        async with aiofiles.open(file_path, 'wb') as out:
+            while chunk := await file.read(settings.UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > settings.MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=413,
+                        detail=f"File exceeds maximum size of {settings.MAX_FILE_SIZE // (1024 * 1024)} MB"
+                    )
+                digest.update(chunk)
+                await out.write(chunk)
+    except BaseException:
+        DatasetStore.remove(file_path)
+        raise
+    return size, digest.hexdigest()
+
+
 @router.post("/analyze/{dataset_id}")
 async def analyze_dataset(
     dataset_id: int,
     analysis_type: str,
+    response: Response,
     sample_fraction: float = 0.2,
     target_column: Optional[str] = None,
     cluster_column: Optional[str] = None,
+    mode: str = "memory",
+    engine: str = "pandas",
     db: Session = Depends(get_db)
 ):
     """
     Perform analysis on uploaded dataset using specified sampling method(s)
     
+    Every sampler is seeded, so analyses are memoized by dataset content
+    and parameters; the X-Result-Cache header is 'hit' or 'miss'. A hit
+    returns the stored response without recording a new experiment.
+    
     Parameters:
     - dataset_id: ID of the uploaded dataset
     - analysis_type: Type of analysis ('random', 'stratified', 'cluster', 'combined')
     - sample_fraction: Fraction of data to sample (0-1)
     - target_column: Column for stratified sampling
     - cluster_column: Column for cluster sampling
+    - mode: 'memory' loads the dataset; 'streaming' samples in one pass over
+      stored chunks with memory bounded by the sample size. Cluster sampling
+      reads only the selected clusters from a copy partitioned by
+      cluster_column (built on first use) unless the dataset is already cached
+    - engine: 'pandas' runs in this process; 'spark' runs the samplers on a
+      local Spark session against the stored files, for datasets too large
+      for pandas (memory mode only; requires pyspark)
+    """
+    try:
+        result, cache_status = await run_in_threadpool(
+            _cached_analysis, db, dataset_id, analysis_type, sample_fraction,
+            target_column, cluster_column, mode, engine
+        )
+        response.headers[RESULT_CACHE_HEADER] = cache_status
+        return result
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error analyzing dataset: {str(e)}")
+
+
+@router.post("/sweep/{dataset_id}")
+async def sweep_dataset(
+    dataset_id: int,
+    methods: Optional[List[str]] = Query(None),
+    fractions: Optional[List[float]] = Query(None),
+    seeds: List[int] = Query([42]),
+    target_column: Optional[str] = None,
+    cluster_column: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    """
+    Compare sampling methods over a grid of fractions and seeds
+    
+    The dataset is loaded once for the whole grid, and each method builds
+    one shuffled ordering per seed from which every fraction is taken, so
+    larger fractions extend the samples of smaller ones.
+    
+    Parameters:
+    - methods: Repeatable; 'random', 'stratified', 'cluster' (default:
+      random, plus stratified/cluster when their column is given)
+    - fractions: Repeatable sample fractions (default SAMPLING_FRACTIONS);
+      for cluster sampling, the fraction of clusters selected
+    - seeds: Repeatable random seeds (default 42)
+    - target_column: Column for stratified sampling
+    - cluster_column: Column for cluster sampling
+    """
+    try:
+        return await run_in_threadpool(
+            _run_sweep, db, dataset_id, methods, fractions, seeds, target_column, cluster_column
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running sweep: {str(e)}")
+
+
+@router.post("/bootstrap/{dataset_id}")
+async def bootstrap_dataset(
+    dataset_id: int,
+    analysis_type: str,
+    sample_fraction: float = 0.2,
+    replicates: Optional[int] = Query(None, ge=2),
+    confidence: float = 0.95,
+    target_column: Optional[str] = None,
+    cluster_column: Optional[str] = None,
+    seed: int = 42,
+    include_replicates: bool = False,
+    db: Session = Depends(get_db)
+):
+    """
+    Repeat a sampler many times and report confidence intervals for its accuracy
+    
+    Parameters:
+    - analysis_type: Sampler to repeat ('random', 'stratified', 'cluster')
+    - sample_fraction: Fraction of data to sample (0-1); cluster sampling
+      keeps half the clusters, as in /analyze
+    - replicates: Number of samples (default BOOTSTRAP_REPLICATES, at most
+      BOOTSTRAP_MAX_REPLICATES)
+    - confidence: Coverage of the percentile intervals (0-1)
+    - target_column: Column for stratified sampling
+    - cluster_column: Column for cluster sampling
+    - seed: Seed of the replicate draws
+    - include_replicates: Also return every replicate's accuracy and error margin
     """
     try:
-        if not 0 < sample_fraction <= 1:
-            raise HTTPException(status_code=400, detail="sample_fraction must be between 0 and 1")
+        return await run_in_threadpool(
+            _run_bootstrap, db, dataset_id, analysis_type, sample_fraction, replicates, confidence,
+            target_column, cluster_column, seed, include_replicates
+        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error running bootstrap: {str(e)}")
 
-        # Get dataset from database
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-        if not dataset:
+
+@router.post("/jobs/{dataset_id}", status_code=202)
+async def submit_analysis_job(
+    dataset_id: int,
+    analysis_type: str,
+    sample_fraction: float = 0.2,
+    target_column: Optional[str] = None,
+    cluster_column: Optional[str] = None,
+    mode: str = "memory",
+    engine: str = "pandas",
+    db: AsyncSession = Depends(get_async_db)
+):
+    """
+    Queue an analysis to run in the background worker pool
+    
+    Takes the same parameters as /analyze/{dataset_id}; poll
+    /jobs/{job_id} for the result.
+    """
+    try:
+        _validate_analysis_request(analysis_type, sample_fraction, mode, engine)
+        if await db.scalar(select(Dataset.id).where(Dataset.id == dataset_id)) is None:
             raise HTTPException(status_code=404, detail="Dataset not found")
         
-        # Load the dataset
-        if dataset.file_path.endswith('.csv'):
-            df = pd.read_csv(dataset.file_path)
-        else:
-            df = pd.read_json(dataset.file_path)
-        
-        # Perform analysis based on type
-        if analysis_type == 'random':
-            return await _random_analysis(df, dataset, sample_fraction, db)
-        elif analysis_type == 'stratified':
-            if not target_column:
-                raise HTTPException(status_code=400, detail="target_column required for stratified sampling")
-            return await _stratified_analysis(df, dataset, target_column, sample_fraction, db)
-        elif analysis_type == 'cluster':
-            if not cluster_column:
-                raise HTTPException(status_code=400, detail="cluster_column required for cluster sampling")
-            return await _cluster_analysis(df, dataset, cluster_column, db)
-        elif analysis_type == 'combined':
-            return await _combined_analysis(df, dataset, sample_fraction, target_column, cluster_column, db)
-        else:
-            raise HTTPException(status_code=400, detail="Invalid analysis_type")
-    
+        job = job_manager.submit(
+            run_analysis_job,
+            dataset_id=dataset_id,
+            analysis_type=analysis_type,
+            sample_fraction=sample_fraction,
+            target_column=target_column,
+            cluster_column=cluster_column,
+            mode=mode,
+            engine=engine
+        )
+        return {"job_id": job.id, "status": job.status}
     except HTTPException:
         raise
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=429, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error analyzing dataset: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error submitting job: {str(e)}")
 
 
-async def _random_analysis(df: pd.DataFrame, dataset: Dataset, sample_fraction: float, db: Session):
-    """Random sampling analysis"""
-    sampled_df, metrics = SamplingMethods.random_sampling(df, sample_fraction)
-    
-    accuracy_metrics = PerformanceMetrics.calculate_accuracy_metrics(df, sampled_df)
-    scalability_score = PerformanceMetrics.calculate_scalability_score(
-        metrics['execution_time'],
-        metrics['memory_usage'],
-        metrics['cpu_usage'],
-        sample_fraction
-    )
+@router.get("/jobs/{job_id}")
+async def get_analysis_job(job_id: str):
+    """
+    Get the status of a background analysis, and its result once completed
+    """
+    job = job_manager.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
+@router.delete("/jobs/{job_id}")
+async def cancel_analysis_job(job_id: str):
+    """
+    Cancel a background analysis
+    
+    Pending jobs never start; a running job finishes in its worker but its
+    result is discarded.
+    """
+    job = job_manager.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return {"job_id": job.id, "status": job.status, "cancel_requested": job.cancel_requested}
+
+
+def _validate_analysis_request(analysis_type: str, sample_fraction: float, mode: str,
+                               engine: str = "pandas") -> None:
+    if not 0 < sample_fraction <= 1:
+        raise HTTPException(status_code=400, detail="sample_fraction must be between 0 and 1")
+    if analysis_type not in ('random', 'stratified', 'cluster', 'combined'):
+        raise HTTPException(status_code=400, detail="Invalid analysis_type")
+    if mode not in ('memory', 'streaming'):
+        raise HTTPException(status_code=400, detail="mode must be 'memory' or 'streaming'")
+    if engine not in ENGINES:
+        raise HTTPException(status_code=400, detail="engine must be 'pandas' or 'spark'")
+    if engine == 'spark' and mode != 'memory':
+        raise HTTPException(status_code=400, detail="The spark engine doesn't support streaming mode")
+    if engine == 'spark' and not spark_available():
+        raise HTTPException(status_code=400, detail="The spark engine requires pyspark to be installed")
+
+
+def _run_analysis(db: Session, dataset_id: int, analysis_type: str, sample_fraction: float,
+                  target_column: Optional[str], cluster_column: Optional[str], mode: str,
+                  engine: str = "pandas") -> dict:
+    """Load the dataset and run the requested analysis synchronously"""
+    _validate_analysis_request(analysis_type, sample_fraction, mode, engine)
+    
+    # Get dataset from database
+    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    if mode == 'streaming':
+        return _streaming_analysis(dataset, analysis_type, sample_fraction, target_column, cluster_column, db)
+    
+    if engine == 'spark':
+        return _spark_analysis(dataset, analysis_type, sample_fraction, target_column, cluster_column, db)
+    
+    if analysis_type == 'combined':
+        return _combined_analysis(dataset, sample_fraction, target_column, cluster_column, db)
+    
+    if (analysis_type == 'cluster' and cluster_column and DatasetStore.has_columnar(dataset.file_path)
+            and not dataset_cache.contains(dataset.id, {cluster_column})):
+        # Nothing in memory to sample from: read only the selected clusters
+        return _partitioned_cluster_analysis(dataset, cluster_column, db)
+    
+    # Load only the numeric columns plus the stratum/cluster columns
+    df = _load_analysis_frame(dataset, [target_column, cluster_column])
+    stats = _stats_for(_column_statistics(db, dataset), df)
+    
+    # Perform analysis based on type
+    if analysis_type == 'random':
+        return _random_analysis(df, dataset, sample_fraction, stats, db)
+    elif analysis_type == 'stratified':
+        if not target_column:
+            raise HTTPException(status_code=400, detail="target_column required for stratified sampling")
+        return _stratified_analysis(df, dataset, target_column, sample_fraction, stats, db)
+    else:
+        if not cluster_column:
+            raise HTTPException(status_code=400, detail="cluster_column required for cluster sampling")
+        return _cluster_analysis(df, dataset, cluster_column, stats, db)
+
+
+def _cached_analysis(db: Session, dataset_id: int, analysis_type: str, sample_fraction: float,
+                     target_column: Optional[str], cluster_column: Optional[str], mode: str,
+                     engine: str) -> Tuple[dict, str]:
+    """
+    Run an analysis through the result cache
+    
+    Cluster sampling is seeded like the other samplers and orders clusters
+    the same way on every path, so it is cached too. Columns an analysis
+    doesn't use are left out of the key so they don't split otherwise
+    identical entries.
     
-    # Store in database
-    method = db.query(SamplingMethod).filter(
-        SamplingMethod.method_name == "Random Sampling"
-    ).first()
-    if not method:
-        method = SamplingMethod(method_name="Random Sampling", description="Randomly samples rows from dataset")
-        db.add(method)
+    Returns:
+        Tuple of (response, 'hit' | 'miss')
+    """
+    _validate_analysis_request(analysis_type, sample_fraction, mode, engine)
+    
+    dataset = db.get(Dataset, dataset_id)
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    key = result_key(dataset.id, _content_hash(db, dataset), {
+        "analysis_type": analysis_type,
+        "sample_fraction": sample_fraction,
+        "target_column": target_column if analysis_type in ('stratified', 'combined') else None,
+        "cluster_column": cluster_column if analysis_type in ('cluster', 'combined') else None,
+        "mode": mode,
+        "engine": engine
+    })
+    result = result_cache.get(key)
+    if result is not None:
+        return result, "hit"
+    
+    result = _run_analysis(db, dataset_id, analysis_type, sample_fraction, target_column,
+                           cluster_column, mode, engine)
+    result_cache.put(dataset.id, key, result)
+    return result, "miss"
+
+
+def _content_hash(db: Session, dataset: Dataset) -> str:
+    """The dataset's content hash, computed and stored once for datasets uploaded without one"""
+    if dataset.content_hash is None:
+        dataset.content_hash = DatasetStore.content_hash(dataset.file_path)
         db.commit()
-        db.refresh(method)
-    
-    experiment = Experiment(
-        dataset_id=dataset.id,
-        method_id=method.id,
-        sample_fraction=sample_fraction,
-        execution_time=metrics['execution_time'],
-        memory_usage=metrics['memory_usage'],
-        cpu_usage=metrics['cpu_usage'],
-        scalability_score=scalability_score,
-        sample_size=metrics['sample_size']
-    )
-    db.add(experiment)
-    db.commit()
-    db.refresh(experiment)
-    
-    accuracy_result = AccuracyResult(
-        experiment_id=experiment.id,
-        original_mean=accuracy_metrics['original_mean'],
-        sample_mean=accuracy_metrics['sample_mean'],
-        error_margin=accuracy_metrics['error_margin'],
-        accuracy_percentage=accuracy_metrics['accuracy_percentage'],
-        f1_score=accuracy_metrics['f1_score'],
-        precision=accuracy_metrics['precision'],
-        recall=accuracy_metrics['recall']
-    )
-    db.add(accuracy_result)
-    db.commit()
+    return dataset.content_hash
+
+
+def run_analysis_job(**params) -> dict:
+    """Process-pool entry point: runs one analysis with its own DB session"""
+    db = SessionLocal()
+    try:
+        return _run_analysis(db, **params)
+    except HTTPException as e:
+        # HTTPException doesn't survive pickling back to the parent
+        raise ValueError(e.detail)
+    finally:
+        db.close()
+
+
+def _run_sweep(db: Session, dataset_id: int, methods: Optional[List[str]], fractions: Optional[List[float]],
+               seeds: List[int], target_column: Optional[str], cluster_column: Optional[str]) -> dict:
+    """Validate a sweep, run it on one load of the dataset and store every run"""
+    if methods is None:
+        methods = ['random'] + (['stratified'] if target_column else []) + (['cluster'] if cluster_column else [])
+    methods = list(dict.fromkeys(methods))
+    fractions = sorted(set(fractions if fractions is not None else settings.SAMPLING_FRACTIONS))
+    seeds = list(dict.fromkeys(seeds))
+    
+    if not methods or not fractions or not seeds:
+        raise HTTPException(status_code=400, detail="methods, fractions and seeds must not be empty")
+    if any(method not in SWEEP_METHODS for method in methods):
+        raise HTTPException(status_code=400, detail="methods must be 'random', 'stratified' or 'cluster'")
+    if any(not 0 < frac <= 1 for frac in fractions):
+        raise HTTPException(status_code=400, detail="fractions must be between 0 and 1")
+    if 'stratified' in methods and not target_column:
+        raise HTTPException(status_code=400, detail="target_column required for stratified sampling")
+    if 'cluster' in methods and not cluster_column:
+        raise HTTPException(status_code=400, detail="cluster_column required for cluster sampling")
+    if len(methods) * len(fractions) * len(seeds) > settings.SWEEP_MAX_RUNS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Sweep exceeds {settings.SWEEP_MAX_RUNS} runs (methods x fractions x seeds)"
+        )
+    
+    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    df = _load_analysis_frame(dataset, [target_column, cluster_column])
+    for column in (target_column if 'stratified' in methods else None,
+                   cluster_column if 'cluster' in methods else None):
+        if column and column not in df.columns:
+            raise HTTPException(status_code=400, detail=f"Column '{column}' not found in dataset")
+    stats = _stats_for(_column_statistics(db, dataset), df)
+    
+    runs = parameter_sweep(df, methods, fractions, seeds, target_column, cluster_column, original_stats=stats)
+    
+    records = []
+    table = []
+    for run in runs:
+        metrics, accuracy_metrics = run["metrics"], run["accuracy"]
+        # Cluster samples are stored with the fraction of rows they actually hold
+        stored_fraction = run["effective_fraction"] if run["method"] == 'cluster' else run["sample_fraction"]
+        scalability_score = PerformanceMetrics.scalability_from_metrics(metrics, stored_fraction)
+        records.append(experiment_record(stored_fraction, metrics, scalability_score, accuracy_metrics))
+        table.append({
+            "method": metrics['method'],
+            "sample_fraction": run["sample_fraction"],
+            "effective_fraction": round(run["effective_fraction"], 4),
+            "seed": run["seed"],
+            **_format_result(metrics, scalability_score, accuracy_metrics),
+            "error_margin": accuracy_metrics['error_margin']
+        })
+    
+    # The whole grid is stored in one transaction
+    save_experiments(db, dataset.id, records)
     
     return {
-        "method": "Random Sampling",
-        "execution_time": round(metrics['execution_time'], 4),
-        "memory_usage": round(metrics['memory_usage'], 2),
-        "cpu_usage": round(metrics['cpu_usage'], 2),
-        "sample_size": metrics['sample_size'],
-        "original_size": metrics['original_size'],
-        "scalability_score": scalability_score,
-        "accuracy": accuracy_metrics['accuracy_percentage'],
-        "f1_score": accuracy_metrics['f1_score'],
-        "precision": accuracy_metrics['precision'],
-        "recall": accuracy_metrics['recall']
+        "dataset_name": dataset.name,
+        "dataset_size": dataset.size_rows,
+        "methods": methods,
+        "fractions": fractions,
+        "seeds": seeds,
+        "table": table,
+        "summary": summarize_sweep(runs)
     }
 
 
-async def _stratified_analysis(df: pd.DataFrame, dataset: Dataset, target_column: str, sample_fraction: float, db: Session):
-    """Stratified sampling analysis"""
-    sampled_df, metrics = SamplingMethods.stratified_sampling(df, target_column, sample_fraction)
-    
-    accuracy_metrics = PerformanceMetrics.calculate_accuracy_metrics(df, sampled_df)
-    scalability_score = PerformanceMetrics.calculate_scalability_score(
-        metrics['execution_time'],
-        metrics['memory_usage'],
-        metrics['cpu_usage'],
-        sample_fraction
-    )
+def _run_bootstrap(db: Session, dataset_id: int, analysis_type: str, sample_fraction: float,
+                   replicates: Optional[int], confidence: float, target_column: Optional[str],
+                   cluster_column: Optional[str], seed: int, include_replicates: bool) -> dict:
+    """Validate a bootstrap request and run it on the cached analysis frame"""
+    replicates = replicates or settings.BOOTSTRAP_REPLICATES
+    if analysis_type not in BOOTSTRAP_METHODS:
+        raise HTTPException(status_code=400, detail="analysis_type must be 'random', 'stratified' or 'cluster'")
+    if not 0 < sample_fraction <= 1:
+        raise HTTPException(status_code=400, detail="sample_fraction must be between 0 and 1")
+    if not 0 < confidence < 1:
+        raise HTTPException(status_code=400, detail="confidence must be between 0 and 1")
+    if replicates > settings.BOOTSTRAP_MAX_REPLICATES:
+        raise HTTPException(
+            status_code=400, detail=f"replicates must be at most {settings.BOOTSTRAP_MAX_REPLICATES}"
+        )
+    column = {'stratified': target_column, 'cluster': cluster_column}.get(analysis_type)
+    if analysis_type != 'random' and not column:
+        name = 'target_column' if analysis_type == 'stratified' else 'cluster_column'
+        raise HTTPException(status_code=400, detail=f"{name} required for {analysis_type} sampling")
     
-    # Store in database
-    method = db.query(SamplingMethod).filter(
-        SamplingMethod.method_name == "Stratified Sampling"
-    ).first()
-    if not method:
-        method = SamplingMethod(method_name="Stratified Sampling", description="Preserves class proportions")
-        db.add(method)
-        db.commit()
-        db.refresh(method)
-    
-    experiment = Experiment(
-        dataset_id=dataset.id,
-        method_id=method.id,
-        sample_fraction=sample_fraction,
-        execution_time=metrics['execution_time'],
-        memory_usage=metrics['memory_usage'],
-        cpu_usage=metrics['cpu_usage'],
-        scalability_score=scalability_score,
-        sample_size=metrics['sample_size']
-    )
-    db.add(experiment)
-    db.commit()
-    db.refresh(experiment)
-    
-    accuracy_result = AccuracyResult(
-        experiment_id=experiment.id,
-        original_mean=accuracy_metrics['original_mean'],
-        sample_mean=accuracy_metrics['sample_mean'],
-        error_margin=accuracy_metrics['error_margin'],
-        accuracy_percentage=accuracy_metrics['accuracy_percentage'],
-        f1_score=accuracy_metrics['f1_score'],
-        precision=accuracy_metrics['precision'],
-        recall=accuracy_metrics['recall']
-    )
-    db.add(accuracy_result)
-    db.commit()
+    dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+    if not dataset:
+        raise HTTPException(status_code=404, detail="Dataset not found")
+    
+    df = _load_analysis_frame(dataset, [column])
+    if column and column not in df.columns:
+        raise HTTPException(status_code=400, detail=f"Column '{column}' not found in dataset")
+    stats = _stats_for(_column_statistics(db, dataset), df)
+    
+    with measure_resources() as usage:
+        result = bootstrap_accuracy(
+            df, analysis_type, sample_fraction, replicates,
+            target_column=target_column, cluster_column=cluster_column, original_stats=stats,
+            confidence=confidence, random_state=seed, include_replicates=include_replicates
+        )
     
     return {
-        "method": "Stratified Sampling",
-        "execution_time": round(metrics['execution_time'], 4),
-        "memory_usage": round(metrics['memory_usage'], 2),
-        "cpu_usage": round(metrics['cpu_usage'], 2),
-        "sample_size": metrics['sample_size'],
-        "original_size": metrics['original_size'],
-        "scalability_score": scalability_score,
-        "accuracy": accuracy_metrics['accuracy_percentage'],
-        "f1_score": accuracy_metrics['f1_score'],
-        "precision": accuracy_metrics['precision'],
-        "recall": accuracy_metrics['recall']
+        "dataset_name": dataset.name,
+        "dataset_size": dataset.size_rows,
+        "method": analysis_type,
+        "sample_fraction": sample_fraction,
+        "seed": seed,
+        "execution_time": round(usage.wall_time, 4),
+        **result
     }
 
 
-async def _cluster_analysis(df: pd.DataFrame, dataset: Dataset, cluster_column: str, db: Session):
-    """Cluster sampling analysis"""
-    sampled_df, metrics = SamplingMethods.cluster_sampling(df, cluster_column)
-    
-    accuracy_metrics = PerformanceMetrics.calculate_accuracy_metrics(df, sampled_df)
-    scalability_score = PerformanceMetrics.calculate_scalability_score(
-        metrics['execution_time'],
-        metrics['memory_usage'],
-        metrics['cpu_usage'],
-        len(sampled_df) / len(df)
-    )
+@router.get("/cache/stats")
+async def get_cache_stats():
+    """
+    Hit/miss/eviction counters for the in-process dataset cache
+    """
+    return dataset_cache.stats()
+
+
+@router.get("/cache/results/stats")
+async def get_result_cache_stats():
+    """
+    Hit/miss/eviction counters for the analysis result cache
+    """
+    return result_cache.stats()
+
+
+def _load_analysis_frame(dataset: Dataset, extra_columns: list) -> pd.DataFrame:
+    """Load the analysis frame through the process-wide dataset cache"""
+    columns = {col for col in extra_columns if col}
+    df = dataset_cache.get(dataset.id, columns)
+    if df is None:
+        # Keep columns other requests already needed so they stay hits
+        columns |= dataset_cache.cached_columns(dataset.id)
+        df = DatasetStore.load_for_analysis(dataset.file_path, list(columns))
+        dataset_cache.put(dataset.id, df, columns)
+    return df
+
+
+def _store_column_statistics(db: Union[Session, AsyncSession], dataset_id: int, stats: dict) -> None:
+    """Add ColumnStatistic rows for stats (see ColumnMoments.statistics); the caller commits"""
+    def stored(value):
+        return None if value is None or math.isnan(value) else value
     
-    # Store in database
-    method = db.query(SamplingMethod).filter(
-        SamplingMethod.method_name == "Cluster Sampling"
-    ).first()
-    if not method:
-        method = SamplingMethod(method_name="Cluster Sampling", description="Samples entire clusters")
-        db.add(method)
-        db.commit()
-        db.refresh(method)
-    
-    experiment = Experiment(
-        dataset_id=dataset.id,
-        method_id=method.id,
-        sample_fraction=len(sampled_df) / len(df),
-        execution_time=metrics['execution_time'],
-        memory_usage=metrics['memory_usage'],
-        cpu_usage=metrics['cpu_usage'],
-        scalability_score=scalability_score,
-        sample_size=metrics['sample_size']
-    )
-    db.add(experiment)
-    db.commit()
-    db.refresh(experiment)
-    
-    accuracy_result = AccuracyResult(
-        experiment_id=experiment.id,
-        original_mean=accuracy_metrics['original_mean'],
-        sample_mean=accuracy_metrics['sample_mean'],
-        error_margin=accuracy_metrics['error_margin'],
-        accuracy_percentage=accuracy_metrics['accuracy_percentage'],
-        f1_score=accuracy_metrics['f1_score'],
-        precision=accuracy_metrics['precision'],
-        recall=accuracy_metrics['recall']
+    db.add_all([
+        ColumnStatistic(
+            dataset_id=dataset_id,
+            column_name=column,
+            count=values["count"],
+            null_count=values["null_count"],
+            mean=stored(values["mean"]),
+            variance=stored(values["variance"]),
+            min_value=stored(values["min"]),
+            max_value=stored(values["max"])
+        )
+        for column, values in stats.items()
+    ])
+
+
+def _column_statistics(db: Session, dataset: Dataset) -> dict:
+    """
+    Full-dataset statistics of the dataset's numeric columns, shaped like
+    ColumnMoments.statistics()
+    
+    Read from the column_statistics table; datasets uploaded before the
+    table existed are scanned once and backfilled.
+    """
+    rows = (
+        db.query(ColumnStatistic)
+        .filter(ColumnStatistic.dataset_id == dataset.id)
+        .order_by(ColumnStatistic.id)
+        .all()
     )
-    db.add(accuracy_result)
-    db.commit()
+    if not rows:
+        stats = DatasetStore.column_statistics(dataset.file_path)
+        _store_column_statistics(db, dataset.id, stats)
+        db.commit()
+        return stats
     
+    def loaded(value):
+        return float('nan') if value is None else value
+    
+    return {
+        row.column_name: {
+            "count": row.count,
+            "null_count": row.null_count,
+            "mean": loaded(row.mean),
+            "variance": loaded(row.variance),
+            "std": math.sqrt(row.variance) if row.variance is not None else float('nan'),
+            "min": loaded(row.min_value),
+            "max": loaded(row.max_value)
+        }
+        for row in rows
+    }
+
+
+def _stats_for(stats: dict, df: pd.DataFrame) -> dict:
+    """Restrict stored statistics to the columns present in df"""
+    return {col: values for col, values in stats.items() if col in df.columns}
+
+
+def _format_result(metrics: dict, scalability_score: float, accuracy_metrics: dict) -> dict:
+    """Response body for one sampling method"""
     return {
-        "method": "Cluster Sampling",
         "execution_time": round(metrics['execution_time'], 4),
         "memory_usage": round(metrics['memory_usage'], 2),
         "cpu_usage": round(metrics['cpu_usage'], 2),
@@ -333,44 +739,175 @@ async def _cluster_analysis(df: pd.DataFrame, dataset: Dataset, cluster_column:
     }
 
 
-async def _combined_analysis(df: pd.DataFrame, dataset: Dataset, sample_fraction: float,
-                            target_column: Optional[str], cluster_column: Optional[str], db: Session):
+def _finish_analysis(db: Session, dataset: Dataset, sample_fraction: float, metrics: dict,
+                     accuracy_metrics: dict) -> dict:
+    """Score, store and format a single-method analysis"""
+    scalability_score = PerformanceMetrics.scalability_from_metrics(metrics, sample_fraction)
+    save_experiments(db, dataset.id, [
+        experiment_record(sample_fraction, metrics, scalability_score, accuracy_metrics)
+    ])
+    return {"method": metrics['method'], **_format_result(metrics, scalability_score, accuracy_metrics)}
+
+
+def _random_analysis(df: pd.DataFrame, dataset: Dataset, sample_fraction: float, stats: dict, db: Session):
+    """Random sampling analysis"""
+    positions, metrics = SamplingMethods.random_sampling(df, sample_fraction)
+    accuracy_metrics = PerformanceMetrics.calculate_accuracy_metrics(
+        df, None, original_stats=stats, sample_positions=positions
+    )
+    return _finish_analysis(db, dataset, sample_fraction, metrics, accuracy_metrics)
+
+
+def _stratified_analysis(df: pd.DataFrame, dataset: Dataset, target_column: str, sample_fraction: float,
+                         stats: dict, db: Session):
+    """Stratified sampling analysis"""
+    positions, metrics = SamplingMethods.stratified_sampling(df, target_column, sample_fraction)
+    accuracy_metrics = PerformanceMetrics.calculate_accuracy_metrics(
+        df, None, original_stats=stats, sample_positions=positions
+    )
+    return _finish_analysis(db, dataset, sample_fraction, metrics, accuracy_metrics)
+
+
+def _cluster_analysis(df: pd.DataFrame, dataset: Dataset, cluster_column: str, stats: dict, db: Session):
+    """Cluster sampling analysis"""
+    positions, metrics = SamplingMethods.cluster_sampling(df, cluster_column)
+    accuracy_metrics = PerformanceMetrics.calculate_accuracy_metrics(
+        df, None, original_stats=stats, sample_positions=positions
+    )
+    return _finish_analysis(db, dataset, len(positions) / len(df), metrics, accuracy_metrics)
+
+
+def _partitioned_cluster_analysis(dataset: Dataset, cluster_column: str, db: Session):
+    """
+    Cluster sampling analysis that reads only the selected clusters from the
+    layout partitioned by cluster_column, scored against the stored statistics
+    """
+    sampled_df, metrics = StreamingSampling.cluster_sampling(dataset.file_path, cluster_column)
+    stats = _stats_for(_column_statistics(db, dataset), sampled_df)
+    accuracy_metrics = PerformanceMetrics.calculate_accuracy_metrics(None, sampled_df, original_stats=stats)
+    sample_fraction = metrics['sample_size'] / metrics['original_size'] if metrics['original_size'] else 0.0
+    return _finish_analysis(db, dataset, sample_fraction, metrics, accuracy_metrics)
+
+
+def _streaming_analysis(dataset: Dataset, analysis_type: str, sample_fraction: float,
+                        target_column: Optional[str], cluster_column: Optional[str], db: Session):
+    """
+    Out-of-core analysis: samples while streaming the stored dataset and
+    scores the sample against the statistics stored at upload
+    """
+    DatasetStore.ensure_columnar(dataset.file_path)
+    if analysis_type == 'cluster':
+        if not cluster_column:
+            raise HTTPException(status_code=400, detail="cluster_column required for cluster sampling")
+        return _partitioned_cluster_analysis(dataset, cluster_column, db)
+    
+    stats = db.query(ColumnStatistic.id).filter(ColumnStatistic.dataset_id == dataset.id).first()
+    # Legacy datasets have no stored statistics; collect them in the sampling pass
+    moments = None if stats else ColumnMoments()
+    
+    if analysis_type == 'random':
+        columns = DatasetStore.analysis_columns(dataset.file_path)
+        sampled_df, metrics = StreamingSampling.random_sampling(
+            dataset.file_path, sample_fraction, dataset.size_rows, columns=columns, moments=moments
+        )
+    elif analysis_type == 'stratified':
+        if not target_column:
+            raise HTTPException(status_code=400, detail="target_column required for stratified sampling")
+        columns = DatasetStore.analysis_columns(dataset.file_path, [target_column])
+        sampled_df, metrics = StreamingSampling.stratified_sampling(
+            dataset.file_path, target_column, sample_fraction, columns=columns, moments=moments
+        )
+    else:
+        raise HTTPException(status_code=400, detail="Streaming mode supports analysis_type 'random', 'stratified' or 'cluster'")
+    
+    if moments is not None:
+        _store_column_statistics(db, dataset.id, moments.statistics())
+        db.commit()
+    stats = _stats_for(_column_statistics(db, dataset), sampled_df)
+    accuracy_metrics = PerformanceMetrics.calculate_accuracy_metrics(None, sampled_df, original_stats=stats)
+    return _finish_analysis(db, dataset, sample_fraction, metrics, accuracy_metrics)
+
+
+def _combined_analysis(dataset: Dataset, sample_fraction: float,
+                      target_column: Optional[str], cluster_column: Optional[str], db: Session):
     """Combined analysis of all three methods"""
-    results = SamplingMethods.combined_sampling(df, sample_fraction, target_column, cluster_column)
+    stats = _column_statistics(db, dataset)
+    if dataset.size_rows >= settings.PARALLEL_COMBINED_MIN_ROWS:
+        # Fan the methods out to worker processes reading the columnar copy
+        results = combined_evaluation(dataset.file_path, sample_fraction, target_column, cluster_column,
+                                      original_stats=stats)
+    else:
+        # Small datasets: pool overhead outweighs the gain, run in-process
+        df = _load_analysis_frame(dataset, [target_column, cluster_column])
+        stats = _stats_for(stats, df)
+        results = {}
+        for method in COMBINED_METHODS:
+            try:
+                result = evaluate_method(df, method, sample_fraction, target_column, cluster_column,
+                                         original_stats=stats)
+                if result is not None:
+                    results[method] = result
+            except Exception as e:
+                results[method] = {'error': str(e)}
+    
+    return _combined_response(dataset, results, db)
+
+
+def _spark_analysis(dataset: Dataset, analysis_type: str, sample_fraction: float,
+                    target_column: Optional[str], cluster_column: Optional[str], db: Session):
+    """
+    Analysis on the Spark engine: the samples stay in Spark and are scored
+    through their statistics against those stored at upload
+    """
+    if analysis_type == 'stratified' and not target_column:
+        raise HTTPException(status_code=400, detail="target_column required for stratified sampling")
+    if analysis_type == 'cluster' and not cluster_column:
+        raise HTTPException(status_code=400, detail="cluster_column required for cluster sampling")
     
+    stats = _column_statistics(db, dataset)
+    if analysis_type != 'combined':
+        result = spark.evaluate_method(
+            dataset.file_path, f"{analysis_type}_sampling", sample_fraction,
+            target_column, cluster_column, original_stats=stats
+        )
+        return _finish_analysis(db, dataset, result['sample_fraction'], result['metrics'], result['accuracy'])
+    
+    results = {}
+    for method in COMBINED_METHODS:
+        try:
+            result = spark.evaluate_method(dataset.file_path, method, sample_fraction,
+                                           target_column, cluster_column, original_stats=stats)
+            if result is not None:
+                results[method] = result
+        except Exception as e:
+            results[method] = {'error': str(e)}
+    return _combined_response(dataset, results, db)
+
+
+def _combined_response(dataset: Dataset, results: dict, db: Session) -> dict:
+    """Store and format the per-method results of a combined analysis"""
     combined_results = {
         "dataset_name": dataset.name,
-        "dataset_size": len(df),
+        "dataset_size": dataset.size_rows,
         "methods": {}
     }
     
+    records = []
     for method_name, method_data in results.items():
         if 'error' in method_data:
             continue
         
-        sampled_df = method_data['sample']
         metrics = method_data['metrics']
+        accuracy_metrics = method_data['accuracy']
+        scalability_score = PerformanceMetrics.scalability_from_metrics(metrics, method_data['sample_fraction'])
+        records.append(experiment_record(method_data['sample_fraction'], metrics, scalability_score, accuracy_metrics))
         
-        accuracy_metrics = PerformanceMetrics.calculate_accuracy_metrics(df, sampled_df)
-        scalability_score = PerformanceMetrics.calculate_scalability_score(
-            metrics['execution_time'],
-            metrics['memory_usage'],
-            metrics['cpu_usage'],
-            len(sampled_df) / len(df)
+        combined_results["methods"][metrics['method']] = _format_result(
+            metrics, scalability_score, accuracy_metrics
         )
-        
-        combined_results["methods"][metrics['method']] = {
-            "execution_time": round(metrics['execution_time'], 4),
-            "memory_usage": round(metrics['memory_usage'], 2),
-            "cpu_usage": round(metrics['cpu_usage'], 2),
-            "sample_size": metrics['sample_size'],
-            "original_size": metrics['original_size'],
-            "scalability_score": scalability_score,
-            "accuracy": accuracy_metrics['accuracy_percentage'],
-            "f1_score": accuracy_metrics['f1_score'],
-            "precision": accuracy_metrics['precision'],
-            "recall": accuracy_metrics['recall']
-        }
+    
+    # Every method's experiment is stored in one transaction
+    save_experiments(db, dataset.id, records)
     
     # Add comparison summary
     comparison = PerformanceMetrics.compare_methods(results)
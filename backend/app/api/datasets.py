@@ -3,34 +3,102 @@ Datasets API Endpoints
 Handles dataset management
 """
 
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import List
-from app.core.database import get_db
-from app.models.models import Dataset, Experiment, AccuracyResult
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, Response
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import Select, delete, func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload, selectinload
+from typing import List, Optional
+from app.core.database import AsyncSessionLocal, get_async_db
+from app.core.cache import dataset_cache
+from app.core.results import result_cache
+from app.core.storage import DatasetStore
+from app.core.pagination import (
+    LISTING_FORMATS, NEXT_CURSOR_HEADER, decode_cursor, encode_cursor, ndjson_response, page_size
+)
+from app.models.models import Dataset, Experiment, AccuracyResult, ColumnStatistic, SamplingMethod
 from app.schemas.schemas import DatasetResponse
 
 router = APIRouter()
 
 @router.get("/", response_model=List[DatasetResponse])
-async def get_datasets(db: Session = Depends(get_db)):
+async def get_datasets(
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    format: str = "json",
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Get all datasets
+    Get datasets in id order, one page at a time
+    
+    Without limit or cursor every dataset is returned in one list, as
+    before pagination existed; passing either one switches to pages.
+    
+    Parameters:
+    - limit: Page size (default PAGE_SIZE_DEFAULT when paging, at most PAGE_SIZE_MAX)
+    - cursor: Value of the X-Next-Cursor header of the previous page
+    - format: 'json' for a page, 'ndjson' to stream every dataset after the
+      cursor (up to limit, if given) one JSON object per line
     """
     try:
-        datasets = db.query(Dataset).all()
-        return datasets
+        after_id = _listing_params(cursor, format)
+        
+        statement = select(Dataset).order_by(Dataset.id)
+        if after_id is not None:
+            statement = statement.where(Dataset.id > after_id)
+        
+        if format == 'ndjson':
+            return ndjson_response(
+                _limited(statement, limit),
+                lambda dataset: DatasetResponse.model_validate(dataset).model_dump()
+            )
+        
+        return await _page(db, statement, limit, cursor, response)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving datasets: {str(e)}")
 
 
+def _listing_params(cursor: Optional[str], format: str) -> Optional[int]:
+    """Validate the shared listing parameters and return the cursor's last id"""
+    if format not in LISTING_FORMATS:
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'")
+    try:
+        return decode_cursor(cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+def _limited(statement: Select, limit: Optional[int]) -> Select:
+    return statement.limit(limit) if limit else statement
+
+
+async def _page(db: AsyncSession, statement: Select, limit: Optional[int], cursor: Optional[str],
+                response: Response) -> list:
+    """
+    Fetch one page of an id-ordered select, setting the next-page cursor
+    header when more rows follow; every row when neither limit nor cursor
+    is given, so callers that don't page still see the whole listing
+    """
+    if limit is None and not cursor:
+        return (await db.scalars(statement)).all()
+    size = page_size(limit)
+    rows = (await db.scalars(statement.limit(size + 1))).all()
+    if len(rows) > size:
+        rows = rows[:size]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+    return rows
+
+
 @router.get("/{dataset_id}", response_model=DatasetResponse)
-async def get_dataset(dataset_id: int, db: Session = Depends(get_db)):
+async def get_dataset(dataset_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get specific dataset by ID
     """
     try:
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+        dataset = await db.get(Dataset, dataset_id)
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
         
@@ -42,74 +110,106 @@ async def get_dataset(dataset_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/{dataset_id}/experiments")
-async def get_dataset_experiments(dataset_id: int, db: Session = Depends(get_db)):
+async def get_dataset_experiments(
+    dataset_id: int,
+    response: Response,
+    limit: Optional[int] = Query(None, ge=1),
+    cursor: Optional[str] = None,
+    format: str = "json",
+    db: AsyncSession = Depends(get_async_db)
+):
     """
-    Get all experiments for a specific dataset
+    Get experiments for a specific dataset in id order, one page at a time
+    
+    Takes the same limit/cursor/format parameters as the dataset listing.
     """
     try:
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-        if not dataset:
+        after_id = _listing_params(cursor, format)
+        if await db.scalar(select(Dataset.id).where(Dataset.id == dataset_id)) is None:
             raise HTTPException(status_code=404, detail="Dataset not found")
         
-        experiments = db.query(Experiment).filter(Experiment.dataset_id == dataset_id).all()
+        # Load methods and accuracy results up front instead of once per row
+        statement = (
+            select(Experiment)
+            .options(joinedload(Experiment.sampling_method), selectinload(Experiment.accuracy_results))
+            .where(Experiment.dataset_id == dataset_id)
+            .order_by(Experiment.id)
+        )
+        if after_id is not None:
+            statement = statement.where(Experiment.id > after_id)
         
-        result = []
-        for exp in experiments:
-            exp_data = {
-                "id": exp.id,
-                "method_id": exp.method_id,
-                "method_name": exp.sampling_method.method_name,
-                "sample_fraction": exp.sample_fraction,
-                "execution_time": exp.execution_time,
-                "memory_usage": exp.memory_usage,
-                "cpu_usage": exp.cpu_usage,
-                "scalability_score": exp.scalability_score,
-                "sample_size": exp.sample_size,
-                "experiment_date": exp.experiment_date
-            }
-            
-            if exp.accuracy_results:
-                accuracy = exp.accuracy_results[0]
-                exp_data["accuracy_results"] = {
-                    "original_mean": accuracy.original_mean,
-                    "sample_mean": accuracy.sample_mean,
-                    "error_margin": accuracy.error_margin,
-                    "accuracy_percentage": accuracy.accuracy_percentage,
-                    "f1_score": accuracy.f1_score,
-                    "precision": accuracy.precision,
-                    "recall": accuracy.recall
-                }
-            
-            result.append(exp_data)
+        if format == 'ndjson':
+            return ndjson_response(_limited(statement, limit), _experiment_data)
         
-        return result
+        return [_experiment_data(exp) for exp in await _page(db, statement, limit, cursor, response)]
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving experiments: {str(e)}")
 
 
+def _experiment_data(exp: Experiment) -> dict:
+    """Response body for one experiment"""
+    exp_data = {
+        "id": exp.id,
+        "method_id": exp.method_id,
+        "method_name": exp.sampling_method.method_name,
+        "sample_fraction": exp.sample_fraction,
+        "execution_time": exp.execution_time,
+        "memory_usage": exp.memory_usage,
+        "cpu_usage": exp.cpu_usage,
+        "scalability_score": exp.scalability_score,
+        "sample_size": exp.sample_size,
+        "experiment_date": exp.experiment_date
+    }
+    
+    if exp.accuracy_results:
+        accuracy = exp.accuracy_results[0]
+        exp_data["accuracy_results"] = {
+            "original_mean": accuracy.original_mean,
+            "sample_mean": accuracy.sample_mean,
+            "error_margin": accuracy.error_margin,
+            "accuracy_percentage": accuracy.accuracy_percentage,
+            "f1_score": accuracy.f1_score,
+            "precision": accuracy.precision,
+            "recall": accuracy.recall
+        }
+    
+    return exp_data
+
+
 @router.delete("/{dataset_id}")
-async def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
+async def delete_dataset(dataset_id: int, background_tasks: BackgroundTasks,
+                         db: AsyncSession = Depends(get_async_db)):
     """
-    Delete a dataset and its associated experiments
+    Delete a dataset, its experiments and its files
+    
+    Rows are removed with one set-based statement per table in a single
+    transaction; the uploaded file and its derived files are removed in the
+    background after the response is sent, unless a deduplicated upload
+    still links to them.
     """
     try:
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
-        if not dataset:
+        file_path = await db.scalar(select(Dataset.file_path).where(Dataset.id == dataset_id))
+        if file_path is None:
             raise HTTPException(status_code=404, detail="Dataset not found")
         
-        # Delete associated accuracy results
-        experiments = db.query(Experiment).filter(Experiment.dataset_id == dataset_id).all()
-        for exp in experiments:
-            db.query(AccuracyResult).filter(AccuracyResult.experiment_id == exp.id).delete()
+        experiment_ids = select(Experiment.id).where(Experiment.dataset_id == dataset_id)
+        for statement in (
+            delete(AccuracyResult).where(AccuracyResult.experiment_id.in_(experiment_ids)),
+            delete(Experiment).where(Experiment.dataset_id == dataset_id),
+            delete(ColumnStatistic).where(ColumnStatistic.dataset_id == dataset_id),
+            delete(Dataset).where(Dataset.id == dataset_id)
+        ):
+            await db.execute(statement.execution_options(synchronize_session=False))
+        await db.commit()
         
-        # Delete associated experiments
-        db.query(Experiment).filter(Experiment.dataset_id == dataset_id).delete()
+        # Drop the cached frame so the memory is released, and its cached results
+        dataset_cache.invalidate(dataset_id)
+        result_cache.invalidate(dataset_id)
         
-        # Delete dataset
-        db.delete(dataset)
-        db.commit()
+        # Remove the upload and its columnar copy off the request path
+        background_tasks.add_task(_release_files, file_path)
         
         return {"message": "Dataset deleted successfully"}
     except HTTPException:
@@ -118,19 +218,49 @@ async def delete_dataset(dataset_id: int, db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Error deleting dataset: {str(e)}")
 
 
+async def _release_files(file_path: str) -> None:
+    """Remove a dataset's files once no dataset references them any more"""
+    async with AsyncSessionLocal() as db:
+        if await db.scalar(select(Dataset.id).where(Dataset.file_path == file_path).limit(1)) is None:
+            await run_in_threadpool(DatasetStore.remove, file_path)
+
+
 @router.get("/{dataset_id}/summary")
-async def get_dataset_summary(dataset_id: int, db: Session = Depends(get_db)):
+async def get_dataset_summary(dataset_id: int, db: AsyncSession = Depends(get_async_db)):
     """
     Get summary statistics for a dataset
     """
     try:
-        dataset = db.query(Dataset).filter(Dataset.id == dataset_id).first()
+        dataset = await db.get(Dataset, dataset_id)
         if not dataset:
             raise HTTPException(status_code=404, detail="Dataset not found")
         
-        experiments = db.query(Experiment).filter(Experiment.dataset_id == dataset_id).all()
+        # One aggregate query; experiments without accuracy results count as 0%
+        accuracy = func.coalesce(AccuracyResult.accuracy_percentage, 0)
+        best_method = (
+            select(SamplingMethod.method_name)
+            .join(Experiment, Experiment.method_id == SamplingMethod.id)
+            .outerjoin(AccuracyResult, AccuracyResult.experiment_id == Experiment.id)
+            .where(Experiment.dataset_id == dataset_id)
+            .order_by(accuracy.desc(), Experiment.id)
+            .limit(1)
+            .scalar_subquery()
+        )
+        summary = (await db.execute(
+            select(
+                func.count(Experiment.id),
+                func.avg(accuracy),
+                func.max(accuracy),
+                func.max(Experiment.scalability_score),
+                best_method
+            )
+            .select_from(Experiment)
+            .outerjoin(AccuracyResult, AccuracyResult.experiment_id == Experiment.id)
+            .where(Experiment.dataset_id == dataset_id)
+        )).one()
+        total_experiments, avg_accuracy, best_accuracy, best_scalability, best_method_name = summary
         
-        if not experiments:
+        if not total_experiments:
             return {
                 "dataset_id": dataset.id,
                 "dataset_name": dataset.name,
@@ -141,18 +271,6 @@ async def get_dataset_summary(dataset_id: int, db: Session = Depends(get_db)):
                 "experiments": []
             }
         
-        total_experiments = len(experiments)
-        avg_accuracy = sum([
-            exp.accuracy_results[0].accuracy_percentage 
-            if exp.accuracy_results else 0 
-            for exp in experiments
-        ]) / total_experiments if experiments else 0
-        
-        best_experiment = max(
-            experiments,
-            key=lambda x: (x.accuracy_results[0].accuracy_percentage if x.accuracy_results else 0)
-        ) if experiments else None
-        
         return {
             "dataset_id": dataset.id,
             "dataset_name": dataset.name,
@@ -161,15 +279,9 @@ async def get_dataset_summary(dataset_id: int, db: Session = Depends(get_db)):
             "upload_date": dataset.upload_date,
             "total_experiments": total_experiments,
             "average_accuracy": round(avg_accuracy, 2),
-            "best_method": best_experiment.sampling_method.method_name if best_experiment else None,
-            "best_accuracy": round(
-                best_experiment.accuracy_results[0].accuracy_percentage if best_experiment and best_experiment.accuracy_results else 0,
-                2
-            ),
-            "best_scalability": round(
-                max([exp.scalability_score for exp in experiments]) if experiments else 0,
-                2
-            )
+            "best_method": best_method_name,
+            "best_accuracy": round(best_accuracy, 2),
+            "best_scalability": round(best_scalability, 2)
         }
     except HTTPException:
         raise
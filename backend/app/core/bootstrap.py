@@ -0,0 +1,330 @@
+"""
+Bootstrap Module
+Repeated-sampling distributions and confidence intervals for sampling accuracy
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional, Tuple
+from app.core.performance import ColumnMoments
+from app.core.sampling import sorted_group_ranks
+
+BOOTSTRAP_METHODS = ('random', 'stratified', 'cluster')
+
+# Cells (replicates x items) of the selection matrix built per batch
+REPLICATE_BATCH_CELLS = 1 << 22
+
+
+def bootstrap_accuracy(df: pd.DataFrame, method: str, frac: float, replicates: int,
+                       target_column: Optional[str] = None, cluster_column: Optional[str] = None,
+                       original_stats: Optional[Dict[str, Dict[str, float]]] = None,
+                       confidence: float = 0.95, random_state: int = 42,
+                       include_replicates: bool = False) -> Dict[str, Any]:
+    """
+    Draw `replicates` independent samples with the chosen sampler and
+    summarize the distribution of their accuracy
+
+    Every replicate follows the sampler's design exactly: random draws
+    round(frac * n) distinct rows, stratified draws round(frac * stratum
+    size) distinct rows per stratum, cluster keeps every row of half the
+    clusters, as SamplingMethods does. Metrics per replicate are those of
+    PerformanceMetrics.calculate_accuracy_metrics, unrounded.
+
+    Args:
+        df: Analysis frame (numeric columns plus the stratum/cluster column)
+        method: Entry of BOOTSTRAP_METHODS
+        frac: Fraction of data to sample (unused by cluster sampling)
+        replicates: Number of samples to draw
+        target_column: Column for stratified sampling
+        cluster_column: Column for cluster sampling
+        original_stats: Full-dataset statistics (see ColumnMoments.statistics);
+            computed from df when not given
+        confidence: Coverage of the percentile intervals (0-1)
+        random_state: Seed of the replicate draws
+        include_replicates: Also return the per-replicate accuracy and error margin
+
+    Returns:
+        Dictionary with summaries (mean, std, median, interval bounds) of
+        accuracy_percentage, error_margin and each column's mean error
+    """
+    if original_stats is None:
+        moments = ColumnMoments()
+        moments.update(df)
+        original_stats = moments.statistics()
+    columns = [col for col in original_stats if col in df.columns]
+    centers = np.array([original_stats[col]['mean'] for col in columns], dtype=np.float64)
+
+    deviations = replicate_mean_deviations(
+        df, columns, centers, method, frac, replicates,
+        target_column=target_column, cluster_column=cluster_column, random_state=random_state
+    )
+
+    # Same per-column error and averaging as calculate_accuracy_metrics
+    comparable = ~np.isnan(centers) & ~np.isnan(deviations)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        error_pct = np.where(centers != 0, np.abs(deviations) / np.abs(centers) * 100, 0.0)
+    error_pct = np.where(comparable, error_pct, np.nan)
+    scored = comparable.sum(axis=1)
+    with np.errstate(invalid='ignore'):
+        error_margin = np.where(scored > 0, np.nansum(error_pct, axis=1) / np.maximum(scored, 1), 0.0)
+    accuracy = np.maximum(0, 100 - error_margin)
+
+    result = {
+        "replicates": replicates,
+        "confidence": confidence,
+        "accuracy_percentage": _interval(accuracy, confidence),
+        "error_margin": _interval(error_margin, confidence),
+        "column_errors": {
+            col: _interval(error_pct[:, i], confidence) for i, col in enumerate(columns)
+        }
+    }
+    if include_replicates:
+        result["replicate_values"] = {
+            "accuracy_percentage": np.round(accuracy, 4).tolist(),
+            "error_margin": np.round(error_margin, 4).tolist()
+        }
+    return result
+
+
+def replicate_mean_deviations(df: pd.DataFrame, columns: List[str], centers: np.ndarray, method: str,
+                              frac: float, replicates: int, target_column: Optional[str] = None,
+                              cluster_column: Optional[str] = None, random_state: int = 42) -> np.ndarray:
+    """
+    Sample mean minus center of each column, for each of `replicates` samples
+
+    The sampler is described as groups of items (rows, or whole clusters)
+    with a number of distinct items to draw per group. Replicates are built
+    in batches as index matrices of shape (batch, ~sample size), one sorted
+    row of item positions per replicate, and reduced with one gather and
+    row sum per column, so the work grows with the sample size rather than
+    the dataset size and no sample is ever materialized as a frame.
+
+    Returns:
+        Array of shape (replicates, len(columns)); NaN where a replicate
+        has no value in a column
+    """
+    starts, sizes, quotas, values, counts = _sampling_design(
+        df, columns, centers, method, frac, target_column, cluster_column
+    )
+    rng = np.random.default_rng(random_state)
+    sample_size = int(quotas.sum())
+    # Beyond half the items it is cheaper to draw the items left out
+    complement = 2 * sample_size > int(sizes.sum())
+    drawn = sizes - quotas if complement else quotas
+    batch = max(1, REPLICATE_BATCH_CELLS // max(int(drawn.sum()), 1))
+
+    deviations = np.empty((replicates, len(columns)))
+    for first in range(0, replicates, batch):
+        rows = min(batch, replicates - first)
+        positions, corrections = _replicate_positions(rng, rows, starts, sizes, drawn)
+        for j in range(len(columns)):
+            sums = _row_sums(values[j], positions, corrections, complement)
+            if counts[j] is None:
+                sampled = np.full(rows, float(sample_size))
+            else:
+                sampled = _row_sums(counts[j], positions, corrections, complement)
+            with np.errstate(divide='ignore', invalid='ignore'):
+                deviations[first:first + rows, j] = np.where(sampled > 0, sums / sampled, np.nan)
+    return deviations
+
+
+def _row_sums(values: np.ndarray, positions: np.ndarray, corrections: Tuple[np.ndarray, np.ndarray, np.ndarray],
+              complement: bool) -> np.ndarray:
+    """Per-replicate total of values over the drawn items, or over the others if complement"""
+    replicate, items, sign = corrections
+    sums = values.take(positions).sum(axis=1, dtype=np.float64)
+    sums += np.bincount(replicate, weights=sign * values[items], minlength=len(positions))
+    return values.sum(dtype=np.float64) - sums if complement else sums
+
+
+def _sampling_design(df: pd.DataFrame, columns: List[str], centers: np.ndarray, method: str, frac: float,
+                     target_column: Optional[str], cluster_column: Optional[str]
+                     ) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, List[Optional[np.ndarray]]]:
+    """
+    Items of a sampler and how many to draw from each group
+
+    Returns:
+        Tuple of (starts, sizes, quotas, values, counts): items are laid out
+        group after group, group g spanning sizes[g] items from starts[g] of
+        which quotas[g] are drawn. values[j] holds each item's sum of
+        centered values of column j and counts[j] its number of non-missing
+        values, or None when every item is one row with a value in column j.
+        Both end in a zero entry for the padding position of index matrices.
+    """
+    block = df[columns].to_numpy(dtype=np.float64, na_value=np.nan) - centers
+    present = ~np.isnan(block)
+    block[~present] = 0.0
+
+    if method in ('random', 'stratified'):
+        if method == 'random':
+            starts, sizes = np.zeros(1, dtype=np.int64), np.array([len(df)])
+            quotas = np.array([round(min(frac, 1.0) * len(df))])
+        else:
+            if target_column not in df.columns:
+                raise ValueError(f"Column '{target_column}' not found in dataset")
+            codes, uniques = pd.factorize(df[target_column], sort=True)
+            rows = np.flatnonzero(codes >= 0)
+            order = rows[np.argsort(codes[rows], kind='stable')]
+            block, present = block[order], present[order]
+            sizes = np.bincount(codes[rows], minlength=len(uniques))
+            quotas = np.round(min(frac, 1.0) * sizes).astype(np.int64)
+            starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        counts = [None if column.all() else _padded(column) for column in present.T]
+        return starts, sizes, quotas, _padded(block.T), counts
+
+    if cluster_column not in df.columns:
+        raise ValueError(f"Column '{cluster_column}' not found in dataset")
+    codes, clusters = pd.factorize(df[cluster_column], use_na_sentinel=False)
+    if len(clusters) == 0:
+        raise ValueError("No clusters found in the specified column")
+    # Per-cluster totals: drawing a cluster adds all of its rows at once
+    values = np.zeros((len(columns), len(clusters)))
+    cluster_counts = np.zeros((len(columns), len(clusters)))
+    for j in range(len(columns)):
+        values[j] = np.bincount(codes, weights=block[:, j], minlength=len(clusters))
+        cluster_counts[j] = np.bincount(codes, weights=present[:, j], minlength=len(clusters))
+    return (np.zeros(1, dtype=np.int64), np.array([len(clusters)]), np.array([max(1, len(clusters) // 2)]),
+            _padded(values), list(_padded(cluster_counts)))
+
+
+def _padded(values: np.ndarray) -> np.ndarray:
+    """values as float32 with a trailing zero along the last axis"""
+    padded = np.zeros(values.shape[:-1] + (values.shape[-1] + 1,), dtype=np.float32)
+    padded[..., :-1] = values
+    return padded
+
+
+def _replicate_positions(rng: np.random.Generator, replicates: int, starts: np.ndarray, sizes: np.ndarray,
+                         quotas: np.ndarray) -> Tuple[np.ndarray, Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Draw quotas[g] distinct items uniformly at random from every group g,
+    once per replicate
+
+    Every item is first kept independently with probability p = total
+    quota / total items. Given how many items of a group that keeps, they
+    are a uniformly random subset of the group, so dropping random kept
+    items from the (replicate, group) cells that overshot their quota and
+    adding random other items to those that fell short yields a uniform
+    subset of exactly the quota. Only these few corrections are drawn item
+    by item.
+
+    Returns:
+        Tuple of (positions, corrections). positions has one sorted row of
+        kept item positions per replicate, padded with the item count.
+        corrections is (replicate, item, sign): items to subtract (-1) from
+        or add (+1) to a replicate's row.
+    """
+    n_items = int(sizes.sum())
+    p = quotas.sum() / n_items if n_items else 0.0
+    no_corrections = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))
+    if p == 0:
+        return np.empty((replicates, 0), dtype=np.int64), no_corrections
+    if p >= 1:
+        return np.tile(np.arange(n_items), (replicates, 1)), no_corrections
+
+    positions = _bernoulli_positions(rng, replicates, n_items, p)
+
+    # Row-major positions offset per replicate form one sorted array, in
+    # which each cell's kept items are a contiguous range
+    stride = n_items + 1
+    flat = (positions + (np.arange(replicates) * stride)[:, None]).ravel()
+    cell_start = (np.arange(replicates)[:, None] * stride + starts).ravel()
+    cell_size = np.tile(sizes, replicates)
+    low = np.searchsorted(flat, cell_start)
+    kept = np.searchsorted(flat, cell_start + cell_size) - low
+    quota = np.tile(quotas, replicates)
+
+    def not_kept(values: np.ndarray) -> np.ndarray:
+        found = np.minimum(np.searchsorted(flat, values), len(flat) - 1)
+        return flat[found] != values
+
+    dropped = flat[_distinct_draws(rng, low, kept, np.maximum(kept - quota, 0))]
+    added = _distinct_draws(
+        rng, cell_start, cell_size, np.maximum(quota - kept, 0),
+        eligible=not_kept, hit_rate=(cell_size - kept) / np.maximum(cell_size, 1)
+    )
+    changed = np.concatenate((dropped, added))
+    sign = np.concatenate((-np.ones(len(dropped)), np.ones(len(added))))
+    return positions, (changed // stride, changed % stride, sign)
+
+
+def _bernoulli_positions(rng: np.random.Generator, replicates: int, n_items: int, p: float) -> np.ndarray:
+    """
+    Positions of the items kept by independent Bernoulli(p) trials, one
+    sorted row per replicate padded with n_items
+
+    Gaps between kept items are geometric, drawn as floor(E / -ln(1 - p)) + 1
+    from standard exponentials E, so a row costs about p * n_items draws.
+    Rows are sized well past the expected count; the rare row that doesn't
+    reach past the last item is drawn again.
+    """
+    expected = n_items * p
+    width = int(expected + 8 * np.sqrt(expected * (1 - p)) + 16)
+    scale = 1 / -np.log1p(-p)
+
+    positions = _geometric_positions(rng, (replicates, width), scale)
+    short = np.flatnonzero(positions[:, -1] < n_items)
+    while short.size:
+        positions[short] = _geometric_positions(rng, (len(short), width), scale)
+        short = short[positions[short, -1] < n_items]
+    np.minimum(positions, n_items, out=positions)
+    return positions
+
+
+def _geometric_positions(rng: np.random.Generator, shape: Tuple[int, int], scale: float) -> np.ndarray:
+    """Cumulative sums of geometric gaps, built in place"""
+    gaps = rng.standard_exponential(shape)
+    gaps *= scale
+    positions = gaps.astype(np.int64)
+    positions += 1
+    np.cumsum(positions, axis=1, out=positions)
+    positions -= 1
+    return positions
+
+
+def _distinct_draws(rng: np.random.Generator, low: np.ndarray, span: np.ndarray, need: np.ndarray,
+                    eligible=None, hit_rate: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    For every cell, need[cell] distinct values drawn uniformly from
+    [low[cell], low[cell] + span[cell]) among those passing eligible
+
+    Each round draws every cell's shortfall with headroom for ineligible
+    values and repeats (hit_rate estimates the eligible share), keeping the
+    first distinct eligible values in draw order, which leaves a uniformly
+    random subset.
+    """
+    remaining = need.copy()
+    chosen = np.empty(0, dtype=np.int64)
+    rate = np.ones(len(need)) if hit_rate is None else np.maximum(hit_rate, 1 / np.maximum(span, 1))
+    while remaining.any():
+        draws = np.where(remaining > 0, np.ceil(remaining / rate * 1.25) + 2, 0).astype(np.int64)
+        cell = np.repeat(np.arange(len(need)), draws)
+        values = low[cell] + rng.integers(0, span[cell])
+
+        ok = ~np.isin(values, chosen)
+        if eligible is not None:
+            ok &= eligible(values)
+        hits = np.flatnonzero(ok)
+        _, first = np.unique(values[hits], return_index=True)
+        hits = np.sort(hits[first])
+        keep = hits[sorted_group_ranks(cell[hits]) < remaining[cell[hits]]]
+
+        chosen = np.concatenate((chosen, values[keep]))
+        remaining -= np.bincount(cell[keep], minlength=len(need))
+    return chosen
+
+
+def _interval(values: np.ndarray, confidence: float) -> Dict[str, Optional[float]]:
+    """Mean, spread and percentile interval of one metric over the replicates"""
+    values = values[~np.isnan(values)]
+    if not values.size:
+        return {"mean": None, "std": None, "median": None, "ci_lower": None, "ci_upper": None}
+    tail = (1 - confidence) / 2 * 100
+    lower, median, upper = np.percentile(values, [tail, 50, 100 - tail])
+    return {
+        "mean": round(float(values.mean()), 4),
+        "std": round(float(values.std(ddof=1)) if values.size > 1 else 0.0, 4),
+        "median": round(float(median), 4),
+        "ci_lower": round(float(lower), 4),
+        "ci_upper": round(float(upper), 4)
+    }
@@ -0,0 +1,106 @@
+"""
+Dataset Cache Module
+Process-wide LRU cache of loaded DataFrames, bounded by memory footprint
+"""
+
+import threading
+import pandas as pd
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Set
+from app.core.config import settings
+
+
+class _CacheEntry:
+    __slots__ = ("frame", "columns", "nbytes")
+
+    def __init__(self, frame: pd.DataFrame, columns: Set[str], nbytes: int):
+        self.frame = frame
+        self.columns = columns
+        self.nbytes = nbytes
+
+
+class DatasetCache:
+    """
+    LRU cache of analysis frames keyed by dataset_id
+
+    Entries are sized with DataFrame.memory_usage(deep=True) and evicted
+    least-recently-used first once the total exceeds max_bytes. Each entry
+    remembers the extra (stratum/cluster) columns it was loaded for so a
+    request needing a different column is treated as a miss.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[int, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, dataset_id: int, columns: Set[str]) -> Optional[pd.DataFrame]:
+        """Return the cached frame if it was loaded with all of columns"""
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            if entry is None or not columns <= entry.columns:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(dataset_id)
+            self.hits += 1
+            return entry.frame
+
+    def contains(self, dataset_id: int, columns: Set[str]) -> bool:
+        """Whether get() would hit, without counting a lookup"""
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            return entry is not None and columns <= entry.columns
+
+    def cached_columns(self, dataset_id: int) -> Set[str]:
+        """Extra columns the current entry for dataset_id was loaded with"""
+        with self._lock:
+            entry = self._entries.get(dataset_id)
+            return set(entry.columns) if entry else set()
+
+    def put(self, dataset_id: int, frame: pd.DataFrame, columns: Set[str]) -> None:
+        """Insert or replace the entry for dataset_id, evicting LRU entries to fit"""
+        nbytes = int(frame.memory_usage(deep=True).sum())
+        with self._lock:
+            self._remove(dataset_id)
+            if nbytes > self.max_bytes:
+                return
+            while self._entries and self._size + nbytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.nbytes
+                self.evictions += 1
+            self._entries[dataset_id] = _CacheEntry(frame, set(columns), nbytes)
+            self._size += nbytes
+
+    def invalidate(self, dataset_id: int) -> None:
+        with self._lock:
+            self._remove(dataset_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "size_mb": round(self._size / (1024 * 1024), 2),
+                "max_mb": round(self.max_bytes / (1024 * 1024), 2),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+            }
+
+    def _remove(self, dataset_id: int) -> None:
+        entry = self._entries.pop(dataset_id, None)
+        if entry is not None:
+            self._size -= entry.nbytes
+
+
+dataset_cache = DatasetCache(settings.DATASET_CACHE_MAX_MB * 1024 * 1024)
@@ -19,6 +19,12 @@ class Settings(BaseSettings):
     DB_NAME: str = os.getenv("DB_NAME", "sampling_analysis")
     DATABASE_URL_OVERRIDE: str = os.getenv("DATABASE_URL", "")
     
+    # Connection pool per engine (sync and async each get their own)
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "5"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+    DB_POOL_TIMEOUT: int = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    
     @property
     def DATABASE_URL(self) -> str:
         if self.DATABASE_URL_OVERRIDE:
@@ -39,9 +45,52 @@ class Settings(BaseSettings):
     # Upload settings
     MAX_FILE_SIZE: int = 100 * 1024 * 1024  # 100MB
     UPLOAD_DIR: str = "uploads"
+    UPLOAD_CHUNK_SIZE: int = 1024 * 1024  # bytes read per await while streaming to disk
+    INGEST_CHUNK_ROWS: int = int(os.getenv("INGEST_CHUNK_ROWS", "100000"))
+    # Ingest stores compact dtypes: categorical strings with at most this many
+    # distinct values, and numeric downcasts that lose no precision
+    OPTIMIZE_DTYPES: bool = os.getenv("OPTIMIZE_DTYPES", "True").lower() == "true"
+    CATEGORICAL_MAX_CARDINALITY: int = int(os.getenv("CATEGORICAL_MAX_CARDINALITY", "1000"))
+    # Row-group size of the per-cluster-column layouts read by cluster sampling
+    CLUSTER_ROW_GROUP_ROWS: int = int(os.getenv("CLUSTER_ROW_GROUP_ROWS", "16384"))
+    
+    # Dataset cache settings
+    DATASET_CACHE_MAX_MB: int = int(os.getenv("DATASET_CACHE_MAX_MB", "512"))
+    
+    # Analysis result cache: LRU size, expiry, and an optional on-disk tier ("" disables it)
+    RESULT_CACHE_MAX_ENTRIES: int = int(os.getenv("RESULT_CACHE_MAX_ENTRIES", "1024"))
+    RESULT_CACHE_TTL_SECONDS: int = int(os.getenv("RESULT_CACHE_TTL_SECONDS", "3600"))
+    RESULT_CACHE_DIR: str = os.getenv("RESULT_CACHE_DIR", "")
+    
+    # Background analysis jobs
+    ANALYSIS_WORKERS: int = int(os.getenv("ANALYSIS_WORKERS", "2"))
+    ANALYSIS_MAX_QUEUED_JOBS: int = int(os.getenv("ANALYSIS_MAX_QUEUED_JOBS", "32"))
+    JOB_RETENTION_SECONDS: int = int(os.getenv("JOB_RETENTION_SECONDS", "3600"))
+    
+    # Combined analysis fans its methods out to worker processes above this size
+    COMBINED_MAX_WORKERS: int = int(os.getenv("COMBINED_MAX_WORKERS", "3"))
+    PARALLEL_COMBINED_MIN_ROWS: int = int(os.getenv("PARALLEL_COMBINED_MIN_ROWS", "100000"))
+    
+    # Resource instrumentation: trace Python allocations with tracemalloc (adds overhead)
+    TRACE_PYTHON_ALLOCATIONS: bool = os.getenv("TRACE_PYTHON_ALLOCATIONS", "False").lower() == "true"
+    
+    # Listing endpoints: keyset page sizes and rows fetched per server-side cursor batch
+    PAGE_SIZE_DEFAULT: int = int(os.getenv("PAGE_SIZE_DEFAULT", "100"))
+    PAGE_SIZE_MAX: int = int(os.getenv("PAGE_SIZE_MAX", "1000"))
+    STREAM_BATCH_ROWS: int = int(os.getenv("STREAM_BATCH_ROWS", "1000"))
     
     # Sampling settings
     SAMPLING_FRACTIONS: List[float] = [0.1, 0.2, 0.5]
+    # Largest methods x fractions x seeds grid accepted by the sweep endpoint
+    SWEEP_MAX_RUNS: int = int(os.getenv("SWEEP_MAX_RUNS", "200"))
+    # Replicates drawn by the bootstrap endpoint by default, and at most
+    BOOTSTRAP_REPLICATES: int = int(os.getenv("BOOTSTRAP_REPLICATES", "1000"))
+    BOOTSTRAP_MAX_REPLICATES: int = int(os.getenv("BOOTSTRAP_MAX_REPLICATES", "10000"))
+    
+    # Spark engine (engine=spark): local master, driver heap and shuffle width
+    SPARK_MASTER: str = os.getenv("SPARK_MASTER", "local[*]")
+    SPARK_DRIVER_MEMORY: str = os.getenv("SPARK_DRIVER_MEMORY", "2g")
+    SPARK_SHUFFLE_PARTITIONS: int = int(os.getenv("SPARK_SHUFFLE_PARTITIONS", "8"))
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,117 @@
+"""
+Dtype Optimization Module
+Chooses compact column types at ingest: categorical strings and lossless numeric downcasts
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, Optional
+from pandas.api.types import (
+    infer_dtype, is_bool_dtype, is_float_dtype, is_integer_dtype, is_numeric_dtype, is_string_dtype
+)
+from app.core.config import settings
+
+# A string column becomes categorical only if it repeats its values on average
+MAX_CATEGORY_RATIO = 0.5
+
+# Largest magnitude below which every integer is exact in float32
+FLOAT32_EXACT_INT = 2 ** 24
+
+INTEGER_DOWNCASTS = (np.int8, np.int16, np.int32)
+
+
+class DtypeProfile:
+    """
+    Observations, gathered chunk by chunk, from which compact column types
+    are chosen
+
+    Records integer ranges, whether every float survives a round trip
+    through float32, and the distinct values of string columns until there
+    are more than max_categories of them. Like ColumnMoments, chunks can be
+    folded in while streaming without keeping the data.
+    """
+
+    def __init__(self, max_categories: Optional[int] = None):
+        self.max_categories = max_categories or settings.CATEGORICAL_MAX_CARDINALITY
+        self.rows = 0
+        self.minimum: Dict[str, Any] = {}
+        self.maximum: Dict[str, Any] = {}
+        self.float32_exact: Dict[str, bool] = {}
+        # None once a column is known not to be a low-cardinality string column
+        self.categories: Dict[str, Optional[set]] = {}
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        self.rows += len(chunk)
+        for col in chunk.columns:
+            values = chunk[col]
+            if is_bool_dtype(values.dtype):
+                continue
+            if is_numeric_dtype(values.dtype):
+                self._update_numeric(col, values)
+            elif is_string_dtype(values.dtype):
+                self._update_strings(col, values)
+
+    def schema(self, dtypes: Dict[str, Any]) -> Dict[str, Any]:
+        """dtypes with each column replaced by its compact type, where one is lossless"""
+        return {col: self._compact(col, dtype) for col, dtype in dtypes.items()}
+
+    def _update_numeric(self, col: str, values: pd.Series) -> None:
+        present = values.dropna()
+        if present.empty:
+            return
+        low, high = present.min(), present.max()
+        self.minimum[col] = min(self.minimum.get(col, low), low)
+        self.maximum[col] = max(self.maximum.get(col, high), high)
+
+        if is_integer_dtype(values.dtype):
+            exact = -FLOAT32_EXACT_INT <= low and high <= FLOAT32_EXACT_INT
+        else:
+            floats = present.to_numpy(dtype=np.float64)
+            with np.errstate(over='ignore'):
+                exact = bool(np.array_equal(floats.astype(np.float32), floats))
+        self.float32_exact[col] = self.float32_exact.get(col, True) and exact
+
+    def _update_strings(self, col: str, values: pd.Series) -> None:
+        categories = self.categories.get(col, set())
+        if categories is None:
+            return
+        kind = infer_dtype(values, skipna=True)
+        if kind == 'empty':
+            self.categories[col] = categories
+            return
+        if kind != 'string':
+            self.categories[col] = None
+            return
+        categories.update(values.dropna().unique())
+        self.categories[col] = categories if len(categories) <= self.max_categories else None
+
+    def _compact(self, col: str, dtype):
+        if is_bool_dtype(dtype):
+            return dtype
+        if is_integer_dtype(dtype) and col in self.minimum:
+            for candidate in INTEGER_DOWNCASTS:
+                info = np.iinfo(candidate)
+                if info.min <= self.minimum[col] and self.maximum[col] <= info.max:
+                    return np.dtype(candidate)
+            return dtype
+        if is_float_dtype(dtype) and dtype != np.float32 and self.float32_exact.get(col, False):
+            return np.dtype(np.float32)
+        categories = self.categories.get(col)
+        if (categories and is_string_dtype(dtype)
+                and len(categories) <= max(1.0, self.rows * MAX_CATEGORY_RATIO)):
+            return pd.CategoricalDtype(sorted(categories))
+        return dtype
+
+
+def compact_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """df converted to the compact types a DtypeProfile of it chooses"""
+    profile = DtypeProfile()
+    profile.update(df)
+    schema = profile.schema(df.dtypes.to_dict())
+    changed = {col: dtype for col, dtype in schema.items() if dtype != df[col].dtype}
+    return df.astype(changed) if changed else df
+
+
+def memory_bytes(df: pd.DataFrame) -> int:
+    """Deep memory footprint of df's columns"""
+    return int(df.memory_usage(deep=True, index=False).sum())
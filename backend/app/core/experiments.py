@@ -0,0 +1,151 @@
+"""
+Experiment Persistence Module
+Stores the experiments and accuracy results of an analysis in one transaction
+"""
+
+import threading
+from typing import Dict, Any, Iterable, List
+from sqlalchemy import event, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from app.models.models import Experiment, AccuracyResult, SamplingMethod
+
+METHOD_DESCRIPTIONS = {
+    "Random Sampling": "Randomly samples rows from dataset",
+    "Stratified Sampling": "Preserves class proportions",
+    "Cluster Sampling": "Samples entire clusters"
+}
+
+# SamplingMethod ids cached per process, per database (keyed by engine URL);
+# creating or dropping the table (a fresh schema, a test reset) clears them
+_method_ids: Dict[str, Dict[str, int]] = {}
+_method_ids_lock = threading.Lock()
+
+
+@event.listens_for(SamplingMethod.__table__, "after_create")
+@event.listens_for(SamplingMethod.__table__, "after_drop")
+def _clear_method_ids(target, connection, **kw) -> None:
+    with _method_ids_lock:
+        _method_ids.pop(connection.engine.url.render_as_string(hide_password=True), None)
+
+
+def experiment_record(sample_fraction: float, metrics: Dict[str, Any],
+                      scalability_score: float, accuracy_metrics: Dict[str, Any]) -> Dict[str, Any]:
+    """Bundle one method's outcome for save_experiments"""
+    return {
+        "method": metrics['method'],
+        "sample_fraction": sample_fraction,
+        "metrics": metrics,
+        "scalability_score": scalability_score,
+        "accuracy": accuracy_metrics
+    }
+
+
+def save_experiments(db: Session, dataset_id: int, records: List[Dict[str, Any]]) -> None:
+    """
+    Store the experiments of one analysis request and their accuracy results
+
+    All rows go into a single transaction: the Experiment rows are flushed
+    together (one multi-row INSERT ... RETURNING on PostgreSQL), the
+    AccuracyResult rows follow in a single executemany, and SamplingMethod
+    ids come from the in-process cache, so a warm request costs one commit.
+    A method row created concurrently by another request makes the first
+    attempt fail on the unique name, and a cached id whose row is gone (the
+    table was recreated) fails its foreign key; either way the cached ids
+    are dropped and the write is retried once with ids read afresh.
+
+    Args:
+        db: Database session
+        dataset_id: Dataset the experiments ran on
+        records: Entries built with experiment_record()
+    """
+    if not records:
+        return
+    try:
+        _write_experiments(db, dataset_id, records)
+    except IntegrityError:
+        db.rollback()
+        _forget_method_ids(db)
+        _write_experiments(db, dataset_id, records)
+
+
+def _write_experiments(db: Session, dataset_id: int, records: List[Dict[str, Any]]) -> None:
+    method_ids = _resolve_method_ids(db, {record["method"] for record in records})
+    experiments = [
+        Experiment(
+            dataset_id=dataset_id,
+            method_id=method_ids[record["method"]],
+            sample_fraction=record["sample_fraction"],
+            execution_time=record["metrics"]['execution_time'],
+            memory_usage=record["metrics"]['memory_usage'],
+            cpu_usage=record["metrics"]['cpu_usage'],
+            scalability_score=record["scalability_score"],
+            sample_size=record["metrics"]['sample_size']
+        )
+        for record in records
+    ]
+    db.add_all(experiments)
+    db.flush()
+
+    # Accuracy rows need no ids back, so they go in one executemany
+    db.execute(insert(AccuracyResult), [
+        _accuracy_row(experiment.id, record["accuracy"])
+        for experiment, record in zip(experiments, records)
+    ])
+    db.commit()
+
+    # Only ids of committed rows are cached
+    with _method_ids_lock:
+        _method_ids.setdefault(_database_key(db), {}).update(method_ids)
+
+
+def _resolve_method_ids(db: Session, names: Iterable[str]) -> Dict[str, int]:
+    """
+    Ids of the named sampling methods: cached ids first, one query for the
+    rest, and new rows (flushed in the caller's transaction) for any that
+    don't exist yet
+    """
+    with _method_ids_lock:
+        cached = _method_ids.get(_database_key(db), {})
+        ids = {name: cached[name] for name in names if name in cached}
+    missing = [name for name in names if name not in ids]
+    if not missing:
+        return ids
+
+    rows = db.query(SamplingMethod.method_name, SamplingMethod.id).filter(
+        SamplingMethod.method_name.in_(missing)
+    ).all()
+    ids.update({name: method_id for name, method_id in rows})
+
+    new_methods = [
+        SamplingMethod(method_name=name, description=METHOD_DESCRIPTIONS.get(name))
+        for name in missing if name not in ids
+    ]
+    if new_methods:
+        db.add_all(new_methods)
+        db.flush()
+        ids.update({method.method_name: method.id for method in new_methods})
+    return ids
+
+
+def _database_key(db: Session) -> str:
+    return db.get_bind().url.render_as_string(hide_password=True)
+
+
+def _forget_method_ids(db: Session) -> None:
+    """Drop the cached ids of db's database so they are read again"""
+    with _method_ids_lock:
+        _method_ids.pop(_database_key(db), None)
+
+
+def _accuracy_row(experiment_id: int, accuracy_metrics: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "experiment_id": experiment_id,
+        "original_mean": float(accuracy_metrics['original_mean']),
+        "sample_mean": float(accuracy_metrics['sample_mean']),
+        "error_margin": float(accuracy_metrics['error_margin']),
+        "accuracy_percentage": float(accuracy_metrics['accuracy_percentage']),
+        "f1_score": float(accuracy_metrics['f1_score']),
+        "precision": float(accuracy_metrics['precision']),
+        "recall": float(accuracy_metrics['recall'])
+    }
@@ -0,0 +1,154 @@
+"""
+Background Jobs Module
+Runs heavy analyses in a process pool so they never block the event loop
+"""
+
+import multiprocessing
+import multiprocessing.util
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from app.core.config import settings
+
+
+class JobStatus:
+    PENDING = "pending"
+    RUNNING = "running"
+    COMPLETED = "completed"
+    FAILED = "failed"
+    CANCELLED = "cancelled"
+
+
+class JobQueueFullError(Exception):
+    """Raised when the number of unfinished jobs reaches the configured limit"""
+
+
+class Job:
+    """A submitted unit of work and its outcome"""
+
+    def __init__(self, job_id: str, params: Dict[str, Any], future: Future):
+        self.id = job_id
+        self.params = params
+        self.future = future
+        self.submitted_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.cancel_requested = False
+
+    @property
+    def status(self) -> str:
+        if self.future.cancelled() or (self.cancel_requested and self.future.done()):
+            return JobStatus.CANCELLED
+        if self.future.done():
+            return JobStatus.FAILED if self.future.exception() else JobStatus.COMPLETED
+        if self.future.running():
+            return JobStatus.RUNNING
+        return JobStatus.PENDING
+
+    def to_dict(self) -> Dict[str, Any]:
+        status = self.status
+        data = {
+            "job_id": self.id,
+            "status": status,
+            "params": self.params,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "cancel_requested": self.cancel_requested
+        }
+        if status == JobStatus.COMPLETED:
+            data["result"] = self.future.result()
+        elif status == JobStatus.FAILED:
+            data["error"] = str(self.future.exception())
+        return data
+
+
+def _init_worker():
+    """
+    Turn off the frame cache in the worker: each worker would otherwise hold
+    up to DATASET_CACHE_MAX_MB of its own, and delete_dataset can't reach it.
+    Also shut down the worker's own combined-analysis pool when it exits:
+    atexit doesn't run in pool workers, which instead wait for their child
+    processes, so an idle pool would keep the worker alive forever. The
+    finalizer must run before the pool's queues close theirs (priority 10).
+    """
+    from app.core import parallel
+    from app.core.cache import dataset_cache
+    dataset_cache.max_bytes = 0
+    multiprocessing.util.Finalize(None, parallel.shutdown, exitpriority=100)
+
+
+class JobManager:
+    """
+    Submits callables to a process pool and tracks them by job id
+
+    The pool is created on first use with ANALYSIS_WORKERS processes and at
+    most ANALYSIS_MAX_QUEUED_JOBS jobs may be unfinished at once. Workers
+    are spawned rather than forked, so they start from a clean interpreter
+    instead of inheriting the server's locks, connections, process pools and
+    caches. Pending jobs are cancelled outright; a job that is already
+    running cannot be interrupted inside the pool, so it is flagged and its
+    result discarded when it finishes.
+    """
+
+    def __init__(self, max_workers: int, max_queued: int, retention_seconds: int):
+        self.max_workers = max_workers
+        self.max_queued = max_queued
+        self.retention_seconds = retention_seconds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn: Callable[..., Any], **params) -> Job:
+        with self._lock:
+            self._prune()
+            unfinished = sum(1 for job in self._jobs.values() if not job.future.done())
+            if unfinished >= self.max_queued:
+                raise JobQueueFullError(f"Too many unfinished jobs (limit {self.max_queued})")
+
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_init_worker
+                )
+            job = Job(uuid.uuid4().hex, params, self._executor.submit(fn, **params))
+            job.future.add_done_callback(lambda _: setattr(job, "finished_at", time.time()))
+            self._jobs[job.id] = job
+            return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if not job.future.done() and not job.future.cancel():
+                job.cancel_requested = True
+            return job
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+    def _prune(self) -> None:
+        """Forget finished jobs older than the retention window"""
+        cutoff = time.time() - self.retention_seconds
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished_at is not None and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+job_manager = JobManager(
+    settings.ANALYSIS_WORKERS,
+    settings.ANALYSIS_MAX_QUEUED_JOBS,
+    settings.JOB_RETENTION_SECONDS
+)
@@ -0,0 +1,67 @@
+"""
+Pagination Module
+Opaque keyset cursors and NDJSON streaming for large listings
+"""
+
+import base64
+import json
+from typing import Any, Callable, Dict, Optional
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+# Response header carrying the cursor of the next page, absent on the last page
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+LISTING_FORMATS = ('json', 'ndjson')
+
+
+def encode_cursor(last_id: int) -> str:
+    """Opaque cursor pointing just past the row with id last_id"""
+    payload = json.dumps({"id": last_id}).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    """
+    Id of the last row already returned, or None for the first page
+
+    Raises:
+        ValueError: If the cursor wasn't produced by encode_cursor
+    """
+    if not cursor:
+        return None
+    try:
+        payload = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last_id = json.loads(payload)["id"]
+    except (ValueError, KeyError, TypeError):
+        raise ValueError("Invalid cursor")
+    if not isinstance(last_id, int):
+        raise ValueError("Invalid cursor")
+    return last_id
+
+
+def page_size(limit: Optional[int]) -> int:
+    """Requested page size, defaulting to PAGE_SIZE_DEFAULT and capped at PAGE_SIZE_MAX"""
+    return min(limit or settings.PAGE_SIZE_DEFAULT, settings.PAGE_SIZE_MAX)
+
+
+def ndjson_response(statement: Select, serialize: Callable[[Any], Dict[str, Any]]) -> StreamingResponse:
+    """
+    Stream the rows of an ORM select as newline-delimited JSON while they
+    are read
+
+    Rows are fetched STREAM_BATCH_ROWS at a time through a server-side
+    cursor, so memory stays flat whatever the table size. The generator
+    owns its session because the request's session is closed before the
+    body is streamed.
+    """
+    async def lines():
+        async with AsyncSessionLocal() as db:
+            rows = await db.stream_scalars(statement.execution_options(yield_per=settings.STREAM_BATCH_ROWS))
+            async for row in rows:
+                yield json.dumps(jsonable_encoder(serialize(row))) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
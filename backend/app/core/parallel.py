@@ -0,0 +1,152 @@
+"""
+Parallel Execution Module
+Runs the methods of a combined analysis concurrently in worker processes
+"""
+
+import os
+import threading
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Any, List, Optional
+from app.core.config import settings
+from app.core.sampling import SamplingMethods
+from app.core.performance import PerformanceMetrics
+from app.core.storage import DatasetStore
+from app.core.streaming import StreamingSampling
+
+COMBINED_METHODS = ['random_sampling', 'stratified_sampling', 'cluster_sampling']
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ProcessPoolExecutor:
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.COMBINED_MAX_WORKERS)
+        return _executor
+
+
+def _forget_executor() -> None:
+    """
+    In a forked child the parent's pool is unusable (its management thread
+    and worker pipes belong to the parent) and its lock may have been held
+    at fork time, so start over with neither
+    """
+    global _executor, _executor_lock
+    _executor = None
+    _executor_lock = threading.Lock()
+
+
+os.register_at_fork(after_in_child=_forget_executor)
+
+
+def shutdown() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+def evaluate_method(df: pd.DataFrame, method: str, frac: float,
+                    target_column: Optional[str] = None,
+                    cluster_column: Optional[str] = None,
+                    original_stats: Optional[Dict[str, Dict[str, float]]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Run one sampling method and score its sample against df, or against
+    original_stats when the full-dataset statistics are already known
+
+    Returns:
+        Dictionary with metrics, accuracy and the effective sample_fraction,
+        or None when the method's column is missing (matching combined_sampling)
+    """
+    if method == 'random_sampling':
+        positions, metrics = SamplingMethods.random_sampling(df, frac)
+        fraction = frac
+    elif method == 'stratified_sampling':
+        if not target_column or target_column not in df.columns:
+            return None
+        positions, metrics = SamplingMethods.stratified_sampling(df, target_column, frac)
+        fraction = frac
+    else:
+        if not cluster_column or cluster_column not in df.columns:
+            return None
+        positions, metrics = SamplingMethods.cluster_sampling(df, cluster_column)
+        fraction = len(positions) / len(df)
+
+    return {
+        "metrics": metrics,
+        "accuracy": PerformanceMetrics.calculate_accuracy_metrics(
+            df, None, original_stats=original_stats, sample_positions=positions
+        ),
+        "sample_fraction": fraction
+    }
+
+
+def _evaluate_from_file(file_path: str, method: str, frac: float,
+                        target_column: Optional[str], cluster_column: Optional[str],
+                        original_stats: Optional[Dict[str, Dict[str, float]]]) -> Optional[Dict[str, Any]]:
+    """
+    Worker entry point: read only this method's columns from the columnar
+    copy, and only the selected clusters' rows for cluster sampling
+    """
+    if method == 'cluster_sampling':
+        return _evaluate_clusters(file_path, cluster_column, original_stats)
+    column = {'stratified_sampling': target_column, 'cluster_sampling': cluster_column}.get(method)
+    df = DatasetStore.load_for_analysis(file_path, [column])
+    if original_stats is not None:
+        original_stats = {col: stats for col, stats in original_stats.items() if col in df.columns}
+    return evaluate_method(df, method, frac, target_column, cluster_column, original_stats)
+
+
+def _evaluate_clusters(file_path: str, cluster_column: Optional[str],
+                       original_stats: Optional[Dict[str, Dict[str, float]]]) -> Optional[Dict[str, Any]]:
+    """Cluster sampling from the layout partitioned by cluster_column"""
+    if not cluster_column or cluster_column not in DatasetStore.analysis_columns(file_path, [cluster_column]):
+        return None
+    sampled_df, metrics = StreamingSampling.cluster_sampling(file_path, cluster_column)
+    if original_stats is not None:
+        original_stats = {col: stats for col, stats in original_stats.items() if col in sampled_df.columns}
+    return {
+        "metrics": metrics,
+        "accuracy": PerformanceMetrics.calculate_accuracy_metrics(None, sampled_df, original_stats=original_stats),
+        "sample_fraction": metrics['sample_size'] / metrics['original_size'] if metrics['original_size'] else 0.0
+    }
+
+
+def combined_evaluation(file_path: str, frac: float,
+                        target_column: Optional[str] = None,
+                        cluster_column: Optional[str] = None,
+                        methods: List[str] = COMBINED_METHODS,
+                        original_stats: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, Any]:
+    """
+    Evaluate the combined-analysis methods concurrently
+
+    Each worker reads its own columns from the on-disk columnar copy, so the
+    source DataFrame is never pickled between processes, and only metrics
+    travel back. Wall time is close to the slowest method instead of the sum.
+    original_stats (the stored full-dataset statistics) spares each worker
+    recomputing them.
+
+    Returns:
+        Dictionary keyed like combined_sampling: method -> result or {'error': ...}
+    """
+    DatasetStore.ensure_columnar(file_path)
+    executor = _get_executor()
+    futures = {
+        method: executor.submit(_evaluate_from_file, file_path, method, frac, target_column,
+                                cluster_column, original_stats)
+        for method in methods
+    }
+
+    results = {}
+    for method, future in futures.items():
+        try:
+            result = future.result()
+            if result is not None:
+                results[method] = result
+        except Exception as e:
+            results[method] = {'error': str(e)}
+    return results
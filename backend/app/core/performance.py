@@ -5,29 +5,289 @@ Calculates accuracy, statistical measures, and scalability metrics
 
 import pandas as pd
 import numpy as np
-from typing import Dict, Any, Tuple
+import os
+import sys
+import time
+import tracemalloc
+import psutil
+from contextlib import contextmanager
+from typing import Dict, Any, Iterator, Tuple, Optional
 from sklearn.metrics import f1_score, precision_score, recall_score
+from app.core.config import settings
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+MB = 1024 * 1024
+
+
+def _peak_rss_bytes() -> int:
+    """High-water mark of this process's resident set size"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    info = psutil.Process(os.getpid()).memory_info()
+    return getattr(info, 'peak_wset', info.rss)
+
+
+class ResourceUsage:
+    """Resources consumed inside a measure_resources() block"""
+
+    def __init__(self):
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.memory_mb = 0.0
+        self.peak_rss_mb = 0.0
+        self.python_peak_mb: Optional[float] = None
+
+    @property
+    def cpu_percent(self) -> float:
+        """CPU time as a percentage of wall time (100 = one core fully busy)"""
+        return self.cpu_time / self.wall_time * 100 if self.wall_time > 0 else 0.0
+
+    def combined(self, other: "ResourceUsage") -> "ResourceUsage":
+        """Usage of this block followed by other: times add up, peaks take the larger"""
+        total = ResourceUsage()
+        total.wall_time = self.wall_time + other.wall_time
+        total.cpu_time = self.cpu_time + other.cpu_time
+        total.memory_mb = max(self.memory_mb, other.memory_mb)
+        total.peak_rss_mb = max(self.peak_rss_mb, other.peak_rss_mb)
+        peaks = [peak for peak in (self.python_peak_mb, other.python_peak_mb) if peak is not None]
+        total.python_peak_mb = max(peaks) if peaks else None
+        return total
+
+    @classmethod
+    def from_metrics(cls, metrics: Dict[str, Any]) -> "ResourceUsage":
+        """Rebuild the usage recorded in a metrics dict (see as_metrics)"""
+        usage = cls()
+        usage.wall_time = metrics.get('execution_time', 0.0)
+        usage.cpu_time = metrics.get('cpu_time', 0.0)
+        usage.memory_mb = metrics.get('memory_usage', 0.0)
+        usage.peak_rss_mb = metrics.get('peak_rss_mb', 0.0)
+        usage.python_peak_mb = metrics.get('python_peak_mb')
+        return usage
+
+    def as_metrics(self) -> Dict[str, Any]:
+        """Resource fields of a sampler's metrics dict"""
+        return {
+            "execution_time": self.wall_time,
+            "cpu_time": self.cpu_time,
+            "cpu_usage": self.cpu_percent,
+            "memory_usage": self.memory_mb,
+            "peak_rss_mb": self.peak_rss_mb,
+            "python_peak_mb": self.python_peak_mb
+        }
+
+
+@contextmanager
+def measure_resources(trace_python: Optional[bool] = None) -> Iterator[ResourceUsage]:
+    """
+    Measure a block without sleeping or sampling
+    
+    Reports wall time from perf_counter, process CPU time, the process peak
+    RSS and, when tracing is enabled (TRACE_PYTHON_ALLOCATIONS or
+    trace_python=True), the peak of Python/NumPy allocations from
+    tracemalloc. memory_mb is that traced peak when available, otherwise
+    how far the RSS high-water mark rose above the starting RSS (never
+    negative). tracemalloc is process-wide, so traced measurements of
+    concurrent blocks overlap.
+    
+    Usage:
+        with measure_resources() as usage:
+            ...
+        usage.as_metrics()
+    """
+    usage = ResourceUsage()
+    trace = settings.TRACE_PYTHON_ALLOCATIONS if trace_python is None else trace_python
+    started_tracing = False
+    if trace:
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            started_tracing = True
+        tracemalloc.reset_peak()
+        traced_before = tracemalloc.get_traced_memory()[0]
+    
+    process = psutil.Process(os.getpid())
+    rss_before = process.memory_info().rss
+    peak_before = _peak_rss_bytes()
+    cpu_before = time.process_time()
+    wall_before = time.perf_counter()
+    try:
+        yield usage
+    finally:
+        usage.wall_time = time.perf_counter() - wall_before
+        usage.cpu_time = time.process_time() - cpu_before
+        peak_after = _peak_rss_bytes()
+        usage.peak_rss_mb = peak_after / MB
+        if peak_after > peak_before:
+            growth = peak_after - rss_before
+        else:
+            growth = process.memory_info().rss - rss_before
+        usage.memory_mb = max(0, growth) / MB
+        
+        if trace:
+            usage.python_peak_mb = max(0, tracemalloc.get_traced_memory()[1] - traced_before) / MB
+            usage.memory_mb = usage.python_peak_mb
+            if started_tracing:
+                tracemalloc.stop()
+
+
+# Rows per slice when scanning an in-memory frame, bounding temporaries
+BLOCK_ROWS = 65536
+
+
+def block_moments(block: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Per-column non-null count, mean and sum of squared deviations (M2) of a
+    2-D float block, with NaN as missing
+    
+    Counts, sums and sums of squares are taken together over the block. The
+    values are shifted by one observed value per column first, so the sums
+    of squares don't lose precision to cancellation when the mean is large
+    relative to the spread.
+    """
+    width = block.shape[1]
+    if len(block) == 0:
+        return np.zeros(width), np.zeros(width), np.zeros(width)
+    
+    missing = np.isnan(block)
+    count = len(block) - missing.sum(axis=0).astype(np.float64)
+    shift = block[(~missing).argmax(axis=0), np.arange(width)]
+    shift = np.where(np.isnan(shift), 0.0, shift)
+    
+    centered = block - shift
+    centered[missing] = 0.0
+    total = centered.sum(axis=0)
+    squares = np.einsum('ij,ij->j', centered, centered)
+    
+    shifted_mean = np.divide(total, count, out=np.zeros_like(total), where=count > 0)
+    m2 = np.maximum(squares - total * shifted_mean, 0.0)
+    mean = np.where(count > 0, shifted_mean + shift, 0.0)
+    return count, mean, m2
+
+
+def merge_moments(left: Tuple[np.ndarray, np.ndarray, np.ndarray],
+                  right: Tuple[np.ndarray, np.ndarray, np.ndarray]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Combine two (count, mean, M2) triples with Chan's parallel update"""
+    count_a, mean_a, m2_a = left
+    count_b, mean_b, m2_b = right
+    combined = count_a + count_b
+    safe = np.where(combined > 0, combined, 1.0)
+    delta = mean_b - mean_a
+    mean = mean_a + delta * count_b / safe
+    m2 = m2_a + m2_b + delta ** 2 * count_a * count_b / safe
+    return combined, mean, m2
+
+
+def _numeric_block(df: pd.DataFrame, columns: list, positions: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Numeric columns of df as one 2-D float64 array, missing values as NaN
+
+    With positions, only those rows of the requested columns are gathered,
+    one column at a time, so no copy of the sampled frame is made.
+    """
+    if positions is None:
+        return df[columns].to_numpy(dtype=np.float64, na_value=np.nan)
+    block = np.empty((len(positions), len(columns)), order='F')
+    for j, col in enumerate(columns):
+        block[:, j] = df[col].take(positions).to_numpy(dtype=np.float64, na_value=np.nan)
+    return block
+
+
+class ColumnMoments:
+    """
+    Running count, null count, mean, variance, min and max of every
+    numeric column
+
+    Chunks are folded in with Chan's parallel update, so the full-dataset
+    statistics can be collected while streaming without keeping the data.
+    """
+
+    def __init__(self):
+        self.columns = None
+        self.count = None
+        self.nulls = None
+        self.mean = None
+        self.m2 = None
+        self.minimum = None
+        self.maximum = None
+
+    def update(self, chunk: pd.DataFrame) -> None:
+        if self.columns is None:
+            self.columns = chunk.select_dtypes(include=[np.number]).columns.tolist()
+            width = len(self.columns)
+            self.count = np.zeros(width)
+            self.nulls = np.zeros(width)
+            self.mean = np.zeros(width)
+            self.m2 = np.zeros(width)
+            self.minimum = np.full(width, np.inf)
+            self.maximum = np.full(width, -np.inf)
+        if not self.columns or chunk.empty:
+            return
+
+        block = _numeric_block(chunk, self.columns)
+        count, mean, m2 = block_moments(block)
+        self.nulls += len(block) - count
+        self.count, self.mean, self.m2 = merge_moments((self.count, self.mean, self.m2), (count, mean, m2))
+        self.minimum = np.fmin(self.minimum, np.nanmin(block, axis=0, initial=np.inf))
+        self.maximum = np.fmax(self.maximum, np.nanmax(block, axis=0, initial=-np.inf))
+
+    def statistics(self) -> Dict[str, Dict[str, float]]:
+        """
+        Per-column count, null_count, mean, variance and std (ddof=1),
+        min and max; undefined values are NaN
+        """
+        nan = float('nan')
+        stats = {}
+        for i, col in enumerate(self.columns or []):
+            count = self.count[i]
+            variance = float(self.m2[i] / (count - 1)) if count > 1 else nan
+            stats[col] = {
+                "count": int(count),
+                "null_count": int(self.nulls[i]),
+                "mean": float(self.mean[i]) if count > 0 else nan,
+                "variance": variance,
+                "std": float(np.sqrt(variance)) if count > 1 else nan,
+                "min": float(self.minimum[i]) if count > 0 else nan,
+                "max": float(self.maximum[i]) if count > 0 else nan
+            }
+        return stats
+
 
 class PerformanceMetrics:
     """Class for calculating performance metrics"""
     
     @staticmethod
     def calculate_accuracy_metrics(original_df: pd.DataFrame, 
-                                   sampled_df: pd.DataFrame,
-                                   numeric_columns: list = None) -> Dict[str, float]:
+                                   sampled_df: Optional[pd.DataFrame],
+                                   numeric_columns: list = None,
+                                   original_stats: Optional[Dict[str, Dict[str, float]]] = None,
+                                   sample_positions: Optional[np.ndarray] = None,
+                                   sample_stats: Optional[Dict[str, Dict[str, float]]] = None) -> Dict[str, float]:
         """
         Calculate accuracy metrics by comparing original and sampled datasets
         
         Args:
-            original_df: Original full dataset
-            sampled_df: Sampled dataset
+            original_df: Original full dataset (may be None when original_stats is given)
+            sampled_df: Sampled dataset (None when sample_positions is given)
             numeric_columns: List of numeric columns to compare (default: all numeric)
+            original_stats: Precomputed full-dataset mean/std per column, as
+                returned by ColumnMoments.statistics()
+            sample_positions: Row positions of the sample in original_df, as
+                returned by the SamplingMethods samplers
+            sample_stats: Precomputed sample mean/std per column, shaped like
+                original_stats (e.g. from an engine that keeps the sample)
             
         Returns:
             Dictionary with accuracy metrics
         """
         if numeric_columns is None:
-            numeric_columns = original_df.select_dtypes(include=[np.number]).columns.tolist()
+            if original_stats is not None:
+                numeric_columns = list(original_stats)
+            else:
+                numeric_columns = original_df.select_dtypes(include=[np.number]).columns.tolist()
         
         if not numeric_columns:
             return {
@@ -42,19 +302,36 @@ class PerformanceMetrics:
         
         metrics = {}
         
-        # Calculate mean deviation for each numeric column
-        errors = []
-        for col in numeric_columns:
-            original_mean = original_df[col].mean()
-            sample_mean = sampled_df[col].mean()
-            
-            if pd.notna(original_mean) and pd.notna(sample_mean):
-                error = abs(original_mean - sample_mean)
-                error_pct = (error / abs(original_mean)) * 100 if original_mean != 0 else 0
-                errors.append(error_pct)
+        # One fused pass over the sample's numeric block
+        if sample_stats is not None:
+            sample_mean = np.array([sample_stats.get(col, {}).get('mean', np.nan) for col in numeric_columns],
+                                   dtype=np.float64)
+            sample_std = np.array([sample_stats.get(col, {}).get('std', np.nan) for col in numeric_columns],
+                                  dtype=np.float64)
+        elif sample_positions is not None:
+            sample_mean, sample_std = PerformanceMetrics._column_summaries(
+                original_df, numeric_columns, sample_positions
+            )
+        else:
+            sample_mean, sample_std = PerformanceMetrics._column_summaries(sampled_df, numeric_columns)
+        if original_stats is not None:
+            original_mean = np.array([original_stats[col]['mean'] for col in numeric_columns], dtype=np.float64)
+            original_std = np.array([original_stats[col]['std'] for col in numeric_columns], dtype=np.float64)
+        else:
+            original_mean, original_std = PerformanceMetrics._column_summaries(original_df, numeric_columns)
+        
+        # Mean deviation of each numeric column
+        comparable = ~np.isnan(original_mean) & ~np.isnan(sample_mean)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            error_pct = np.where(
+                original_mean != 0,
+                np.abs(original_mean - sample_mean) / np.abs(original_mean) * 100,
+                0.0
+            )
+        errors = error_pct[comparable]
         
-        if errors:
-            avg_error = np.mean(errors)
+        if errors.size:
+            avg_error = errors.mean()
             accuracy = max(0, 100 - avg_error)
         else:
             accuracy = 100.0
@@ -64,7 +341,7 @@ class PerformanceMetrics:
         try:
             # For classification-like comparison, use ratio of class distributions
             f1, precision, recall = PerformanceMetrics._calculate_distribution_metrics(
-                original_df, sampled_df, numeric_columns
+                original_std, sample_std
             )
         except:
             f1, precision, recall = 0.0, 0.0, 0.0
@@ -74,33 +351,50 @@ class PerformanceMetrics:
         metrics['f1_score'] = round(f1, 4)
         metrics['precision'] = round(precision, 4)
         metrics['recall'] = round(recall, 4)
-        metrics['original_mean'] = round(original_df[numeric_columns[0]].mean(), 4) if numeric_columns else 0.0
-        metrics['sample_mean'] = round(sampled_df[numeric_columns[0]].mean(), 4) if numeric_columns else 0.0
+        metrics['original_mean'] = round(float(original_mean[0]), 4)
+        metrics['sample_mean'] = round(float(sample_mean[0]), 4)
         
         return metrics
     
     @staticmethod
-    def _calculate_distribution_metrics(original_df: pd.DataFrame,
-                                       sampled_df: pd.DataFrame,
-                                       numeric_columns: list) -> Tuple[float, float, float]:
+    def _column_summaries(df: pd.DataFrame, numeric_columns: list,
+                          positions: Optional[np.ndarray] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Per-column mean and std (ddof=1) of df's numeric columns (restricted
+        to the rows at positions, if given), from one block_moments pass per
+        BLOCK_ROWS slice; NaN where undefined, as in pandas
+        """
+        width = len(numeric_columns)
+        moments = (np.zeros(width), np.zeros(width), np.zeros(width))
+        n_rows = len(df) if positions is None else len(positions)
+        for start in range(0, n_rows, BLOCK_ROWS):
+            if positions is None:
+                block = _numeric_block(df.iloc[start:start + BLOCK_ROWS], numeric_columns)
+            else:
+                block = _numeric_block(df, numeric_columns, positions[start:start + BLOCK_ROWS])
+            moments = merge_moments(moments, block_moments(block))
+        
+        count, mean, m2 = moments
+        mean = np.where(count > 0, mean, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            std = np.where(count > 1, np.sqrt(m2 / (count - 1)), np.nan)
+        return mean, std
+    
+    @staticmethod
+    def _calculate_distribution_metrics(original_std: np.ndarray,
+                                       sample_std: np.ndarray) -> Tuple[float, float, float]:
         """
         Calculate F1, Precision, Recall based on distribution similarity
         """
         try:
             # Use coefficient of variation for distribution comparison
-            scores = []
-            
-            for col in numeric_columns:
-                orig_std = original_df[col].std()
-                samp_std = sampled_df[col].std()
-                
-                if orig_std > 0:
-                    std_ratio = samp_std / orig_std
-                    # Closer to 1.0 means better match
-                    score = min(1.0, std_ratio) if std_ratio > 0 else 0.0
-                    scores.append(score)
+            # Only columns whose original std is positive are scored
+            scored = original_std > 0
+            std_ratio = sample_std[scored] / original_std[scored]
+            # Closer to 1.0 means better match
+            scores = np.where(std_ratio > 0, np.minimum(1.0, std_ratio), 0.0)
             
-            if scores:
+            if scores.size:
                 avg_score = np.mean(scores)
                 # Convert to F1-like metric (0-1 scale)
                 f1 = avg_score
@@ -114,18 +408,20 @@ class PerformanceMetrics:
             return 0.0, 0.0, 0.0
     
     @staticmethod
-    def calculate_scalability_score(execution_time: float,
-                                   memory_usage: float,
-                                   cpu_usage: float,
-                                   sample_fraction: float) -> float:
+    def calculate_scalability_score(usage: ResourceUsage, sample_fraction: float) -> float:
         """
         Calculate scalability score (normalized 0-100)
-        Lower execution time and memory usage = higher scalability
+        Lower execution time, memory usage and CPU time = higher scalability
+        
+        CPU is scored on the CPU seconds consumed rather than on CPU time as
+        a percentage of wall time: a single-threaded sampler keeps one core
+        busy for its whole run, so that percentage sits near 100 for every
+        method and cannot tell them apart. CPU seconds grow with the work
+        done, and work spread over several cores costs more than its wall
+        time shows.
         
         Args:
-            execution_time: Execution time in seconds
-            memory_usage: Memory usage in MB
-            cpu_usage: CPU usage percentage
+            usage: Resources measured around the sampler (see measure_resources)
             sample_fraction: Fraction of data sampled
             
         Returns:
@@ -133,19 +429,24 @@ class PerformanceMetrics:
         """
         # Normalize metrics (assuming typical ranges)
         # Execution time: 0-10 seconds is excellent, >30 is poor
-        time_score = max(0, 100 - (execution_time * 10))
+        time_score = max(0, 100 - (usage.wall_time * 10))
         
         # Memory usage: 0-100MB is excellent, >500MB is poor
-        mem_score = max(0, 100 - (memory_usage * 0.2))
+        mem_score = max(0, 100 - (usage.memory_mb * 0.2))
         
-        # CPU usage: <50% is excellent, >90% is poor
-        cpu_score = max(0, 100 - cpu_usage)
+        # CPU time: on the same scale as wall time, 0-10 CPU seconds is excellent
+        cpu_score = max(0, 100 - (usage.cpu_time * 10))
         
         # Combined score (weighted average)
         scalability = (time_score * 0.4 + mem_score * 0.3 + cpu_score * 0.3)
         
         return round(max(0, min(100, scalability)), 2)
     
+    @staticmethod
+    def scalability_from_metrics(metrics: Dict[str, Any], sample_fraction: float) -> float:
+        """Scalability score from a sampler's measured metrics dict"""
+        return PerformanceMetrics.calculate_scalability_score(ResourceUsage.from_metrics(metrics), sample_fraction)
+    
     @staticmethod
     def compare_methods(results: Dict[str, Any]) -> Dict[str, Any]:
         """
@@ -182,13 +483,10 @@ class PerformanceMetrics:
             # Calculate component scores
             exec_time = metrics.get('execution_time', 0)
             memory = metrics.get('memory_usage', 0)
-            cpu = metrics.get('cpu_usage', 0)
             
             efficiency = max(0, 100 - (exec_time * 20 + memory * 0.1))
             accuracy_score = accuracy.get('accuracy_percentage', 0)
-            scalability = PerformanceMetrics.calculate_scalability_score(
-                exec_time, memory, cpu, 0.2
-            )
+            scalability = PerformanceMetrics.scalability_from_metrics(metrics, 0.2)
             
             efficiency_scores[method_name] = efficiency
             accuracy_scores[method_name] = accuracy_score
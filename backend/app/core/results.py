@@ -0,0 +1,193 @@
+"""
+Result Cache Module
+Memoized analysis responses keyed by dataset content and parameters
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional
+from fastapi.encoders import jsonable_encoder
+from app.core.config import settings
+
+# Response header telling whether an analysis was served from the cache:
+# 'hit' or 'miss'
+RESULT_CACHE_HEADER = "X-Result-Cache"
+
+# random_state the analyze endpoint's seeded samplers run with
+ANALYSIS_SEED = 42
+
+
+def result_key(dataset_id: int, content_hash: str, params: Dict[str, Any]) -> str:
+    """Cache key of one analysis: the dataset, its content, the parameters and the seed"""
+    material = json.dumps(
+        {"dataset_id": dataset_id, "content_hash": content_hash, "seed": ANALYSIS_SEED, **params},
+        sort_keys=True
+    )
+    return hashlib.sha256(material.encode("utf-8")).hexdigest()
+
+
+class _ResultEntry:
+    __slots__ = ("dataset_id", "value", "expires_at")
+
+    def __init__(self, dataset_id: int, value: Any, expires_at: float):
+        self.dataset_id = dataset_id
+        self.value = value
+        self.expires_at = expires_at
+
+
+class ResultCache:
+    """
+    TTL + LRU cache of analysis responses, with an optional on-disk tier
+
+    The memory tier holds at most max_entries responses and drops the least
+    recently used first; every entry expires ttl_seconds after it was
+    stored. When directory is set, responses are also written there as JSON
+    so they survive a restart; a memory miss falls back to the disk tier and
+    promotes the hit. Each response is stored as {key}.json, so a lookup is
+    a single open, and an empty marker file {dataset_id}/{key} indexes it
+    for invalidate.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: int, directory: Optional[str] = None):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.directory = directory or None
+        self._entries: "OrderedDict[str, _ResultEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """The cached response for key, or None if absent or expired"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry.value
+            if entry is not None:
+                del self._entries[key]
+
+        stored = self._read_disk(key, now)
+        with self._lock:
+            if stored is None:
+                self.misses += 1
+                return None
+            self.disk_hits += 1
+            self._insert(key, _ResultEntry(*stored))
+            return stored[1]
+
+    def put(self, dataset_id: int, key: str, value: Any) -> None:
+        """Store the response for key in both tiers"""
+        expires_at = time.time() + self.ttl_seconds
+        with self._lock:
+            self._insert(key, _ResultEntry(dataset_id, value, expires_at))
+        self._write_disk(dataset_id, key, value, expires_at)
+
+    def invalidate(self, dataset_id: int) -> None:
+        """Drop every response computed for dataset_id, in both tiers"""
+        with self._lock:
+            for key in [key for key, entry in self._entries.items() if entry.dataset_id == dataset_id]:
+                del self._entries[key]
+        if not self.directory:
+            return
+        index = self._index_dir(dataset_id)
+        try:
+            keys = os.listdir(index)
+        except OSError:
+            return
+        for key in keys:
+            _remove_quietly(self._disk_path(key))
+            _remove_quietly(os.path.join(index, key))
+        try:
+            os.rmdir(index)
+        except OSError:
+            pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "disk_tier": self.directory is not None,
+                "hits": self.hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round((self.hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+            }
+
+    def _insert(self, key: str, entry: _ResultEntry) -> None:
+        self._entries.pop(key, None)
+        if self.max_entries <= 0:
+            return
+        while len(self._entries) >= self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+        self._entries[key] = entry
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _index_dir(self, dataset_id: int) -> str:
+        return os.path.join(self.directory, str(dataset_id))
+
+    def _read_disk(self, key: str, now: float) -> Optional[tuple]:
+        """(dataset_id, value, expires_at) from the disk tier; expired files are removed"""
+        if not self.directory:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, encoding="utf-8") as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored["expires_at"] <= now:
+            _remove_quietly(path)
+            return None
+        return stored["dataset_id"], stored["value"], stored["expires_at"]
+
+    def _write_disk(self, dataset_id: int, key: str, value: Any, expires_at: float) -> None:
+        """Best effort: a response that can't be written stays memory-only"""
+        if not self.directory:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.tmp-{os.getpid()}-{threading.get_ident()}"
+        try:
+            index = self._index_dir(dataset_id)
+            os.makedirs(index, exist_ok=True)
+            open(os.path.join(index, key), "w").close()
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({
+                    "dataset_id": dataset_id,
+                    "expires_at": expires_at,
+                    "value": jsonable_encoder(value)
+                }, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError):
+            _remove_quietly(tmp_path)
+
+
+def _remove_quietly(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+result_cache = ResultCache(
+    settings.RESULT_CACHE_MAX_ENTRIES, settings.RESULT_CACHE_TTL_SECONDS, settings.RESULT_CACHE_DIR
+)
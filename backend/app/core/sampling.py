@@ -5,52 +5,81 @@ Implements Random, Stratified, and Cluster sampling techniques
 
 import pandas as pd
 import numpy as np
-from typing import Tuple, Dict, Any
-import time
-import psutil
-import os
+from typing import Callable, Tuple, Dict, Any, List
 from sklearn.preprocessing import LabelEncoder
+from app.core.performance import ResourceUsage, measure_resources
+
+
+def as_positions(positions: np.ndarray, n_rows: int) -> np.ndarray:
+    """Row positions as int32 when every position of an n_rows frame fits, else int64"""
+    dtype = np.int32 if n_rows <= np.iinfo(np.int32).max else np.int64
+    return np.asarray(positions).astype(dtype, copy=False)
+
+
+def rank_within_groups(codes: np.ndarray, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Order rows by (group code, key) and rank them inside their group
+
+    Args:
+        codes: Integer group code per row
+        keys: Sort key per row (e.g. uniform random numbers)
+
+    Returns:
+        Tuple of (order, rank) where order sorts the rows and rank[i] is the
+        0-based position of row order[i] within its group
+    """
+    order = np.lexsort((keys, codes))
+    return order, sorted_group_ranks(codes[order])
+
+
+def sorted_group_ranks(sorted_codes: np.ndarray) -> np.ndarray:
+    """0-based rank of each element within its run of equal, adjacent codes"""
+    n = len(sorted_codes)
+    positions = np.arange(n)
+    if not n:
+        return positions
+    boundary = np.ones(n, dtype=bool)
+    boundary[1:] = sorted_codes[1:] != sorted_codes[:-1]
+    return positions - np.maximum.accumulate(np.where(boundary, positions, 0))
+
 
 class SamplingMethods:
     """Class containing all sampling methods"""
     
     @staticmethod
-    def random_sampling(df: pd.DataFrame, frac: float = 0.2) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    def random_sampling(df: pd.DataFrame, frac: float = 0.2) -> Tuple[np.ndarray, Dict[str, Any]]:
         """
         Random Sampling: Randomly selects rows from the dataset
         
+        Draws the same rows as df.sample(frac=frac, random_state=42) without
+        copying them.
+        
         Args:
             df: DataFrame to sample from
             frac: Fraction of data to sample (0-1)
             
         Returns:
-            Tuple of (sampled_dataframe, metrics_dict)
+            Tuple of (row_positions, metrics_dict); see materialize()
         """
-        start_time = time.time()
-        process = psutil.Process(os.getpid())
-        memory_before = process.memory_info().rss / 1024 / 1024  # MB
-        
         try:
-            sampled_df = df.sample(frac=frac, random_state=42)
-            
-            end_time = time.time()
-            memory_after = process.memory_info().rss / 1024 / 1024
+            with measure_resources() as usage:
+                n_rows = len(df)
+                positions = np.random.RandomState(42).choice(n_rows, size=round(frac * n_rows), replace=False)
+                positions = as_positions(positions, n_rows)
             
             metrics = {
-                "execution_time": end_time - start_time,
-                "memory_usage": memory_after - memory_before,
-                "cpu_usage": process.cpu_percent(interval=0.1),
-                "sample_size": len(sampled_df),
+                **usage.as_metrics(),
+                "sample_size": len(positions),
                 "original_size": len(df),
                 "method": "Random Sampling"
             }
             
-            return sampled_df, metrics
+            return positions, metrics
         except Exception as e:
             raise ValueError(f"Error in random sampling: {str(e)}")
     
     @staticmethod
-    def stratified_sampling(df: pd.DataFrame, target_column: str, frac: float = 0.2) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    def stratified_sampling(df: pd.DataFrame, target_column: str, frac: float = 0.2) -> Tuple[np.ndarray, Dict[str, Any]]:
         """
         Stratified Sampling: Preserves class proportions by sampling from each stratum
         
@@ -60,83 +89,199 @@ class SamplingMethods:
             frac: Fraction of data to sample from each stratum (0-1)
             
         Returns:
-            Tuple of (sampled_dataframe, metrics_dict)
+            Tuple of (row_positions, metrics_dict); see materialize()
         """
-        start_time = time.time()
-        process = psutil.Process(os.getpid())
-        memory_before = process.memory_info().rss / 1024 / 1024
-        
         try:
-            if target_column not in df.columns:
-                raise ValueError(f"Column '{target_column}' not found in dataset")
-            
-            # Perform stratified sampling by grouping and sampling from each group
-            sampled_df = df.groupby(target_column, group_keys=False).apply(
-                lambda x: x.sample(frac=min(frac, 1.0), random_state=42)
-            ).reset_index(drop=True)
-            
-            end_time = time.time()
-            memory_after = process.memory_info().rss / 1024 / 1024
+            with measure_resources() as usage:
+                if target_column not in df.columns:
+                    raise ValueError(f"Column '{target_column}' not found in dataset")
+                
+                positions = SamplingMethods.stratified_positions(df[target_column], frac)
             
             metrics = {
-                "execution_time": end_time - start_time,
-                "memory_usage": memory_after - memory_before,
-                "cpu_usage": process.cpu_percent(interval=0.1),
-                "sample_size": len(sampled_df),
+                **usage.as_metrics(),
+                "sample_size": len(positions),
                 "original_size": len(df),
                 "method": "Stratified Sampling"
             }
             
-            return sampled_df, metrics
+            return positions, metrics
         except Exception as e:
             raise ValueError(f"Error in stratified sampling: {str(e)}")
     
     @staticmethod
-    def cluster_sampling(df: pd.DataFrame, cluster_column: str) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+    def stratified_positions(strata: pd.Series, frac: float, random_state: int = 42) -> np.ndarray:
         """
-        Cluster Sampling: Divides data into clusters and randomly selects entire clusters
+        Row positions of a proportional stratified sample, without a Python
+        call per stratum
+        
+        Rows are shuffled once and then stably sorted by stratum code, which
+        leaves each stratum in random order; a row is kept when its rank
+        inside its stratum is below the stratum's quota, round(frac * stratum
+        size). Codes are narrowed to the smallest unsigned type so NumPy can
+        use radix sort. Rows with a missing stratum are never selected.
+        
+        Args:
+            strata: Stratum label per row
+            frac: Fraction of data to sample from each stratum (0-1)
+            random_state: Seed for the random keys
+            
+        Returns:
+            Positions of the selected rows, grouped by stratum (see as_positions)
+        """
+        ranking = _stratum_ranking(strata, random_state)
+        return _stratified_selection(ranking, frac, len(strata))
+    
+    @staticmethod
+    def random_sweep(df: pd.DataFrame, fractions: List[float],
+                     random_state: int = 42) -> Dict[float, Tuple[np.ndarray, Dict[str, Any]]]:
+        """
+        Random samples at several fractions from one shuffled ordering
+        
+        The rows are permuted once and the sample at each fraction is the
+        first round(frac * n) positions of that ordering, so every sample is
+        a view of the same array and smaller samples are nested in larger ones.
         
         Args:
             df: DataFrame to sample from
-            cluster_column: Column to use for creating clusters
+            fractions: Fractions of data to sample (0-1)
+            random_state: Seed of the permutation
+            
+        Returns:
+            Dict mapping each fraction to (row_positions, metrics_dict); the
+            metrics charge the shared permutation plus the fraction's own slice
+        """
+        try:
+            n_rows = len(df)
+            with measure_resources() as setup:
+                order = as_positions(np.random.default_rng(random_state).permutation(n_rows), n_rows)
+            
+            return _sweep_samples(
+                setup, fractions, lambda frac: order[:round(min(frac, 1.0) * n_rows)],
+                n_rows, "Random Sampling"
+            )
+        except Exception as e:
+            raise ValueError(f"Error in random sampling: {str(e)}")
+    
+    @staticmethod
+    def stratified_sweep(df: pd.DataFrame, target_column: str, fractions: List[float],
+                         random_state: int = 42) -> Dict[float, Tuple[np.ndarray, Dict[str, Any]]]:
+        """
+        Stratified samples at several fractions from one ranking of the rows
+        
+        The shuffle and the sort by stratum of stratified_positions() are
+        done once; each fraction only compares the in-stratum ranks with its
+        quotas, so each stratum's sample is a prefix of the same random order.
+        
+        Args:
+            df: DataFrame to sample from
+            target_column: Column name to stratify on
+            fractions: Fractions of data to sample from each stratum (0-1)
+            random_state: Seed of the shuffle
             
         Returns:
-            Tuple of (sampled_dataframe, metrics_dict)
+            Dict mapping each fraction to (row_positions, metrics_dict)
+        """
+        try:
+            if target_column not in df.columns:
+                raise ValueError(f"Column '{target_column}' not found in dataset")
+            
+            with measure_resources() as setup:
+                ranking = _stratum_ranking(df[target_column], random_state)
+            
+            return _sweep_samples(
+                setup, fractions, lambda frac: _stratified_selection(ranking, frac, len(df)),
+                len(df), "Stratified Sampling"
+            )
+        except Exception as e:
+            raise ValueError(f"Error in stratified sampling: {str(e)}")
+    
+    @staticmethod
+    def cluster_sweep(df: pd.DataFrame, cluster_column: str, fractions: List[float],
+                      random_state: int = 42) -> Dict[float, Tuple[np.ndarray, Dict[str, Any]]]:
         """
-        start_time = time.time()
-        process = psutil.Process(os.getpid())
-        memory_before = process.memory_info().rss / 1024 / 1024
+        Cluster samples at several fractions of the clusters
         
+        The clusters are shuffled once; the sample at each fraction keeps
+        every row of the first max(1, round(frac * clusters)) clusters of
+        that order. Missing values form a cluster of their own, as in
+        cluster_sampling().
+        
+        Args:
+            df: DataFrame to sample from
+            cluster_column: Column to use for creating clusters
+            fractions: Fractions of the clusters to select (0-1)
+            random_state: Seed of the cluster shuffle
+            
+        Returns:
+            Dict mapping each fraction to (row_positions, metrics_dict)
+        """
         try:
             if cluster_column not in df.columns:
                 raise ValueError(f"Column '{cluster_column}' not found in dataset")
             
-            # Get unique clusters
-            clusters = df[cluster_column].unique()
-            
-            if len(clusters) == 0:
-                raise ValueError("No clusters found in the specified column")
+            with measure_resources() as setup:
+                codes, clusters = pd.factorize(df[cluster_column], use_na_sentinel=False)
+                if len(clusters) == 0:
+                    raise ValueError("No clusters found in the specified column")
+                order = np.random.default_rng(random_state).permutation(len(clusters))
             
-            # Randomly select approximately 50% of clusters
-            num_clusters_to_select = max(1, len(clusters) // 2)
-            selected_clusters = np.random.choice(clusters, size=num_clusters_to_select, replace=False)
+            def select(frac: float) -> np.ndarray:
+                selected = np.zeros(len(clusters), dtype=bool)
+                selected[order[:max(1, round(min(frac, 1.0) * len(clusters)))]] = True
+                return as_positions(np.flatnonzero(selected[codes]), len(df))
             
-            # Sample all data from selected clusters
-            sampled_df = df[df[cluster_column].isin(selected_clusters)].reset_index(drop=True)
+            return _sweep_samples(setup, fractions, select, len(df), "Cluster Sampling")
+        except Exception as e:
+            raise ValueError(f"Error in cluster sampling: {str(e)}")
+    
+    @staticmethod
+    def cluster_sampling(df: pd.DataFrame, cluster_column: str,
+                         random_state: int = 42) -> Tuple[np.ndarray, Dict[str, Any]]:
+        """
+        Cluster Sampling: Divides data into clusters and randomly selects entire clusters
+        
+        Clusters are ordered by value (missing last), as in the partitioned
+        layout's cluster index, so a seed picks the same clusters here as in
+        StreamingSampling.cluster_sampling and SparkSampling.cluster_sampling.
+        
+        Args:
+            df: DataFrame to sample from
+            cluster_column: Column to use for creating clusters
+            random_state: Seed for the cluster choice
             
-            end_time = time.time()
-            memory_after = process.memory_info().rss / 1024 / 1024
+        Returns:
+            Tuple of (row_positions, metrics_dict); see materialize()
+        """
+        try:
+            with measure_resources() as usage:
+                if cluster_column not in df.columns:
+                    raise ValueError(f"Column '{cluster_column}' not found in dataset")
+                
+                # Get unique clusters
+                codes, clusters = pd.factorize(df[cluster_column], sort=True, use_na_sentinel=False)
+                
+                if len(clusters) == 0:
+                    raise ValueError("No clusters found in the specified column")
+                
+                # Randomly select approximately 50% of clusters
+                num_clusters_to_select = max(1, len(clusters) // 2)
+                selected = np.zeros(len(clusters), dtype=bool)
+                selected[np.random.RandomState(random_state).choice(
+                    len(clusters), size=num_clusters_to_select, replace=False
+                )] = True
+                
+                # Sample all rows from selected clusters
+                positions = as_positions(np.flatnonzero(selected[codes]), len(df))
             
             metrics = {
-                "execution_time": end_time - start_time,
-                "memory_usage": memory_after - memory_before,
-                "cpu_usage": process.cpu_percent(interval=0.1),
-                "sample_size": len(sampled_df),
+                **usage.as_metrics(),
+                "sample_size": len(positions),
                 "original_size": len(df),
                 "method": "Cluster Sampling"
             }
             
-            return sampled_df, metrics
+            return positions, metrics
         except Exception as e:
             raise ValueError(f"Error in cluster sampling: {str(e)}")
     
@@ -153,16 +298,17 @@ class SamplingMethods:
             cluster_column: Column for cluster sampling
             
         Returns:
-            Dictionary containing results from all three methods
+            Dictionary containing results from all three methods; each sample
+            is kept as row positions into df
         """
         results = {}
         
         # Random Sampling
         try:
-            random_sample, random_metrics = SamplingMethods.random_sampling(df, frac)
+            random_positions, random_metrics = SamplingMethods.random_sampling(df, frac)
             results['random_sampling'] = {
                 'metrics': random_metrics,
-                'sample': random_sample
+                'positions': random_positions
             }
         except Exception as e:
             results['random_sampling'] = {'error': str(e)}
@@ -170,12 +316,12 @@ class SamplingMethods:
         # Stratified Sampling
         try:
             if target_column and target_column in df.columns:
-                stratified_sample, stratified_metrics = SamplingMethods.stratified_sampling(
+                stratified_positions, stratified_metrics = SamplingMethods.stratified_sampling(
                     df, target_column, frac
                 )
                 results['stratified_sampling'] = {
                     'metrics': stratified_metrics,
-                    'sample': stratified_sample
+                    'positions': stratified_positions
                 }
         except Exception as e:
             results['stratified_sampling'] = {'error': str(e)}
@@ -183,12 +329,65 @@ class SamplingMethods:
         # Cluster Sampling
         try:
             if cluster_column and cluster_column in df.columns:
-                cluster_sample, cluster_metrics = SamplingMethods.cluster_sampling(df, cluster_column)
+                cluster_positions, cluster_metrics = SamplingMethods.cluster_sampling(df, cluster_column)
                 results['cluster_sampling'] = {
                     'metrics': cluster_metrics,
-                    'sample': cluster_sample
+                    'positions': cluster_positions
                 }
         except Exception as e:
             results['cluster_sampling'] = {'error': str(e)}
         
         return results
+    
+    @staticmethod
+    def materialize(df: pd.DataFrame, positions: np.ndarray) -> pd.DataFrame:
+        """
+        Build the sample DataFrame from a sampler's row positions, e.g. for
+        export; analyses score positions directly and never need this copy
+        """
+        return df.take(positions).reset_index(drop=True)
+
+
+def _stratum_ranking(strata: pd.Series, random_state: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Fraction-independent part of stratified_positions()
+    
+    Returns:
+        Tuple of (order, sorted_codes, rank, counts): order lists the
+        non-missing rows grouped by stratum, each stratum in random order;
+        sorted_codes and rank give each listed row's stratum and its rank
+        inside it; counts is the size of each stratum
+    """
+    codes, uniques = pd.factorize(strata, sort=True)
+    rows = np.flatnonzero(codes >= 0)
+    codes = codes[rows]
+    counts = np.bincount(codes, minlength=len(uniques))
+    shuffled = np.random.default_rng(random_state).permutation(len(rows))
+    narrow = codes[shuffled].astype(np.min_scalar_type(max(len(uniques) - 1, 0)))
+    order = shuffled[np.argsort(narrow, kind='stable')]
+    sorted_codes = codes[order]
+    return rows[order], sorted_codes, sorted_group_ranks(sorted_codes), counts
+
+
+def _stratified_selection(ranking: Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray],
+                          frac: float, n_rows: int) -> np.ndarray:
+    """Positions of the rows whose in-stratum rank is below round(frac * stratum size)"""
+    order, sorted_codes, rank, counts = ranking
+    quotas = np.round(min(frac, 1.0) * counts).astype(np.int64)
+    return as_positions(order[rank < quotas[sorted_codes]], n_rows)
+
+
+def _sweep_samples(setup: ResourceUsage, fractions: List[float], select: Callable[[float], np.ndarray],
+                   n_rows: int, method: str) -> Dict[float, Tuple[np.ndarray, Dict[str, Any]]]:
+    """Select each fraction's positions, charging the shared setup to every sample"""
+    samples = {}
+    for frac in fractions:
+        with measure_resources() as usage:
+            positions = select(frac)
+        samples[frac] = (positions, {
+            **setup.combined(usage).as_metrics(),
+            "sample_size": len(positions),
+            "original_size": n_rows,
+            "method": method
+        })
+    return samples
@@ -0,0 +1,246 @@
+"""
+Spark Sampling Module
+Runs the sampling methods on a local Spark session against the stored columnar copy
+"""
+
+import os
+import threading
+import numpy as np
+from typing import Dict, Any, List, Optional, Tuple
+from app.core.config import settings
+from app.core.performance import PerformanceMetrics, measure_resources
+from app.core.storage import DatasetStore
+
+try:
+    from pyspark import SparkContext
+    from pyspark.sql import DataFrame, SparkSession, functions as F
+except ImportError:  # optional engine
+    SparkSession = None
+
+ENGINES = ('pandas', 'spark')
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def spark_available() -> bool:
+    return SparkSession is not None
+
+
+def get_session():
+    """The process-wide Spark session, started on first use"""
+    global _session
+    if SparkSession is None:
+        raise RuntimeError("Spark engine requires pyspark (and a Java runtime)")
+    with _session_lock:
+        if _session is None:
+            _session = (
+                SparkSession.builder
+                .master(settings.SPARK_MASTER)
+                .appName("big-data-sampling-analysis")
+                .config("spark.driver.memory", settings.SPARK_DRIVER_MEMORY)
+                .config("spark.sql.shuffle.partitions", settings.SPARK_SHUFFLE_PARTITIONS)
+                .config("spark.ui.showConsoleProgress", "false")
+                .getOrCreate()
+            )
+        return _session
+
+
+def _forget_session() -> None:
+    """
+    In a forked child the parent's session talks to the parent's JVM over
+    the parent's py4j gateway socket; drop it, and pyspark's own references
+    to it, so the child starts a session of its own on first use
+    """
+    global _session, _session_lock
+    _session = None
+    _session_lock = threading.Lock()
+    if SparkSession is not None:
+        SparkSession._instantiatedSession = None
+        SparkSession._activeSession = None
+        SparkContext._active_spark_context = None
+        SparkContext._gateway = None
+        SparkContext._jvm = None
+
+
+os.register_at_fork(after_in_child=_forget_session)
+
+
+def shutdown() -> None:
+    global _session
+    with _session_lock:
+        if _session is not None:
+            _session.stop()
+            _session = None
+
+
+def _col(name: str):
+    """Column reference that tolerates dots and spaces in the name"""
+    return F.col("`" + name.replace("`", "``") + "`")
+
+
+class SparkSampling:
+    """
+    Sampling methods executed by Spark
+
+    Mirrors SamplingMethods, reading the dataset's Parquet copy instead of a
+    DataFrame. The sample never leaves Spark: each method returns the
+    sample's per-column statistics (shaped like ColumnMoments.statistics())
+    with the usual metrics dict. Resource figures cover the Python driver;
+    the work itself runs in the local Spark JVM.
+    """
+
+    @staticmethod
+    def random_sampling(file_path: str, frac: float,
+                        random_state: int = 42) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Any]]:
+        """
+        Random Sampling with DataFrame.sample (Bernoulli, so the sample size
+        is frac * n on average rather than exactly)
+        """
+        try:
+            with measure_resources() as usage:
+                df = SparkSampling._read(file_path)
+                sample = df.sample(withReplacement=False, fraction=min(frac, 1.0), seed=random_state)
+                size, stats = SparkSampling._summarize(sample, DatasetStore.numeric_columns(file_path))
+
+            return stats, SparkSampling._metrics(usage, size, file_path, "Random Sampling")
+        except Exception as e:
+            raise ValueError(f"Error in random sampling: {str(e)}")
+
+    @staticmethod
+    def stratified_sampling(file_path: str, target_column: str, frac: float,
+                            random_state: int = 42) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Any]]:
+        """
+        Stratified Sampling with sampleBy, giving every stratum the same
+        fraction; rows with a missing stratum are never selected
+        """
+        try:
+            with measure_resources() as usage:
+                df = SparkSampling._read(file_path)
+                if target_column not in df.columns:
+                    raise ValueError(f"Column '{target_column}' not found in dataset")
+
+                strata = [row[0] for row in df.select(_col(target_column)).distinct().collect()]
+                fractions = {stratum: min(frac, 1.0) for stratum in strata if stratum is not None}
+                sample = df.sampleBy(_col(target_column), fractions, seed=random_state)
+                size, stats = SparkSampling._summarize(sample, DatasetStore.numeric_columns(file_path))
+
+            return stats, SparkSampling._metrics(usage, size, file_path, "Stratified Sampling")
+        except Exception as e:
+            raise ValueError(f"Error in stratified sampling: {str(e)}")
+
+    @staticmethod
+    def cluster_sampling(file_path: str, cluster_column: str,
+                         random_state: int = 42) -> Tuple[Dict[str, Dict[str, float]], Dict[str, Any]]:
+        """
+        Cluster Sampling: half of the distinct cluster keys are chosen on the
+        driver and the rows of those clusters are kept with a broadcast
+        left-semi join (null-safe, so a missing key is a cluster of its own)
+        """
+        try:
+            with measure_resources() as usage:
+                df = SparkSampling._read(file_path)
+                if cluster_column not in df.columns:
+                    raise ValueError(f"Column '{cluster_column}' not found in dataset")
+
+                # Ordered like the partitioned layout's cluster index, so the
+                # seed picks the same clusters as the pandas engine
+                clusters = [
+                    row[0] for row in df.select(_col(cluster_column)).distinct()
+                    .orderBy(_col(cluster_column).asc_nulls_last()).collect()
+                ]
+                if not clusters:
+                    raise ValueError("No clusters found in the specified column")
+
+                # Randomly select approximately 50% of clusters
+                chosen = np.random.RandomState(random_state).choice(
+                    len(clusters), size=max(1, len(clusters) // 2), replace=False
+                )
+                keys = get_session().createDataFrame(
+                    [(clusters[i],) for i in chosen],
+                    df.select(_col(cluster_column).alias("_cluster_key")).schema
+                )
+                sample = df.join(
+                    F.broadcast(keys), _col(cluster_column).eqNullSafe(keys["_cluster_key"]), "left_semi"
+                )
+                size, stats = SparkSampling._summarize(sample, DatasetStore.numeric_columns(file_path))
+
+            return stats, SparkSampling._metrics(usage, size, file_path, "Cluster Sampling")
+        except Exception as e:
+            raise ValueError(f"Error in cluster sampling: {str(e)}")
+
+    @staticmethod
+    def _read(file_path: str) -> "DataFrame":
+        return get_session().read.parquet(DatasetStore.ensure_columnar(file_path))
+
+    @staticmethod
+    def _summarize(sample: "DataFrame", columns: List[str]) -> Tuple[int, Dict[str, Dict[str, float]]]:
+        """Sample size and per-column count/mean/std/min/max, in one Spark job"""
+        aggregates = [F.count(F.lit(1))]
+        for col in columns:
+            aggregates += [
+                F.count(_col(col)), F.avg(_col(col)), F.var_samp(_col(col)),
+                F.min(_col(col)), F.max(_col(col))
+            ]
+        row = sample.agg(*aggregates).collect()[0]
+
+        def value(x):
+            return float('nan') if x is None else float(x)
+
+        size = int(row[0])
+        stats = {}
+        for i, col in enumerate(columns):
+            count, mean, variance, minimum, maximum = row[1 + 5 * i:6 + 5 * i]
+            stats[col] = {
+                "count": int(count),
+                "null_count": size - int(count),
+                "mean": value(mean),
+                "variance": value(variance),
+                "std": float(np.sqrt(variance)) if variance is not None else float('nan'),
+                "min": value(minimum),
+                "max": value(maximum)
+            }
+        return size, stats
+
+    @staticmethod
+    def _metrics(usage, sample_size: int, file_path: str, method: str) -> Dict[str, Any]:
+        return {
+            **usage.as_metrics(),
+            "sample_size": sample_size,
+            "original_size": DatasetStore.row_count(file_path),
+            "method": method
+        }
+
+
+def evaluate_method(file_path: str, method: str, frac: float,
+                    target_column: Optional[str] = None,
+                    cluster_column: Optional[str] = None,
+                    original_stats: Optional[Dict[str, Dict[str, float]]] = None) -> Optional[Dict[str, Any]]:
+    """
+    Spark counterpart of parallel.evaluate_method: run one method (keys of
+    COMBINED_METHODS) and score the sample's statistics against original_stats
+
+    Returns:
+        Dictionary with metrics, accuracy and the effective sample_fraction,
+        or None when the method's column isn't given
+    """
+    if method == 'random_sampling':
+        sample_stats, metrics = SparkSampling.random_sampling(file_path, frac)
+    elif method == 'stratified_sampling':
+        if not target_column:
+            return None
+        sample_stats, metrics = SparkSampling.stratified_sampling(file_path, target_column, frac)
+    else:
+        if not cluster_column:
+            return None
+        sample_stats, metrics = SparkSampling.cluster_sampling(file_path, cluster_column)
+
+    if method == 'cluster_sampling':
+        frac = metrics['sample_size'] / metrics['original_size'] if metrics['original_size'] else 0.0
+    return {
+        "metrics": metrics,
+        "accuracy": PerformanceMetrics.calculate_accuracy_metrics(
+            None, None, original_stats=original_stats, sample_stats=sample_stats
+        ),
+        "sample_fraction": frac
+    }
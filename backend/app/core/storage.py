@@ -0,0 +1,621 @@
+"""
+Dataset Storage Module
+Maintains typed columnar (Parquet) copies of uploaded datasets
+"""
+
+import glob
+import hashlib
+import os
+import shutil
+import tempfile
+import threading
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from typing import Dict, Any, Iterator, List, Optional, Tuple
+from pandas.api.types import is_bool_dtype, is_integer_dtype, is_numeric_dtype
+from app.core.config import settings
+from app.core.performance import ColumnMoments
+from app.core.dtypes import DtypeProfile, compact_frame, memory_bytes
+
+COLUMNAR_SUFFIX = ".parquet"
+# Upload formats that can be parsed in bounded chunks of rows
+CHUNKED_EXTENSIONS = ('.csv', '.jsonl', '.ndjson')
+LINE_JSON_EXTENSIONS = ('.jsonl', '.ndjson')
+CLUSTER_LAYOUT_INFIX = ".cluster-"
+# Partition column of the spill files written while building a cluster layout,
+# and how many of its buckets are spilled per pass (each open file buffers pages)
+SPILL_BUCKET_COLUMN = "__cluster_bucket"
+SPILL_MAX_BUCKETS = 32
+
+
+class DatasetStore:
+    """Reads and writes the on-disk representations of a dataset"""
+
+    @staticmethod
+    def columnar_path(file_path: str) -> str:
+        """Path of the columnar copy that lives next to the raw upload"""
+        return f"{file_path}{COLUMNAR_SUFFIX}"
+
+    @staticmethod
+    def has_columnar(file_path: str) -> bool:
+        return os.path.exists(DatasetStore.columnar_path(file_path))
+
+    @staticmethod
+    def artifact_paths(file_path: str) -> List[str]:
+        """The raw upload and every file derived from it, including leftover temp files"""
+        columnar = DatasetStore.columnar_path(file_path)
+        partial = glob.glob(f"{glob.escape(columnar)}.tmp*")
+        layouts = glob.glob(f"{glob.escape(file_path)}{CLUSTER_LAYOUT_INFIX}*")
+        return [file_path, columnar] + sorted(partial) + sorted(layouts)
+
+    @staticmethod
+    def remove(file_path: str) -> None:
+        """Delete the raw upload and its derived files, ignoring missing files"""
+        for path in DatasetStore.artifact_paths(file_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+    @staticmethod
+    def content_hash(file_path: str) -> str:
+        """SHA-256 of the raw upload, read in UPLOAD_CHUNK_SIZE pieces"""
+        digest = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            while chunk := f.read(settings.UPLOAD_CHUNK_SIZE):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    @staticmethod
+    def read_raw(file_path: str) -> pd.DataFrame:
+        """Parse the raw CSV/JSON/JSON Lines upload"""
+        if file_path.endswith('.csv'):
+            return pd.read_csv(file_path)
+        return pd.read_json(file_path, lines=file_path.endswith(LINE_JSON_EXTENSIONS))
+
+    @staticmethod
+    def iter_raw_chunks(file_path: str, chunk_rows: Optional[int] = None,
+                        dtype: Optional[Dict[str, Any]] = None) -> Iterator[pd.DataFrame]:
+        """
+        Parse the raw upload in bounded chunks of rows
+
+        CSV and JSON Lines (.jsonl/.ndjson) are parsed incrementally; plain
+        JSON documents cannot be split and are yielded as a single chunk.
+        """
+        chunk_rows = chunk_rows or settings.INGEST_CHUNK_ROWS
+        if file_path.endswith('.csv'):
+            with pd.read_csv(file_path, chunksize=chunk_rows, dtype=dtype) as reader:
+                for chunk in reader:
+                    yield chunk
+        elif file_path.endswith(LINE_JSON_EXTENSIONS):
+            with pd.read_json(file_path, lines=True, chunksize=chunk_rows, dtype=dtype) as reader:
+                for chunk in reader:
+                    yield chunk
+        else:
+            yield pd.read_json(file_path, dtype=dtype)
+
+    @staticmethod
+    def ingest(file_path: str, chunk_rows: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Profile a stored upload and write its columnar copy without holding
+        the whole dataset in memory
+
+        The first pass counts rows, reconciles per-chunk dtypes into one
+        schema and profiles the values so the schema can be compacted (see
+        DtypeProfile); the second pass re-reads the chunks straight into the
+        compact schema, accumulates per-column statistics and appends them
+        to the Parquet copy, which then carries the schema for later loads.
+
+        Returns:
+            Dictionary with size_rows, column_names, data_types (compact),
+            column_stats (see ColumnMoments.statistics), and memory_bytes:
+            the frame's footprint with default and with compact dtypes
+        """
+        moments = ColumnMoments()
+        profile = DtypeProfile()
+        if not file_path.endswith(CHUNKED_EXTENSIONS):
+            # Plain JSON can't be parsed incrementally; parse it once
+            df = DatasetStore.read_raw(file_path)
+            default_bytes = memory_bytes(df)
+            if settings.OPTIMIZE_DTYPES:
+                df = compact_frame(df)
+            moments.update(df)
+            if len(df):
+                DatasetStore.write_columnar(df, file_path)
+            return {
+                "size_rows": len(df),
+                "column_names": df.columns.tolist(),
+                "data_types": df.dtypes.astype(str).to_dict(),
+                "column_stats": moments.statistics(),
+                "memory_bytes": {"default": default_bytes, "compact": memory_bytes(df)}
+            }
+
+        rows = 0
+        default_bytes = 0
+        dtypes: Dict[str, Any] = {}
+        has_nulls: Dict[str, bool] = {}
+        for chunk in DatasetStore.iter_raw_chunks(file_path, chunk_rows):
+            default_bytes += memory_bytes(chunk)
+            if settings.OPTIMIZE_DTYPES:
+                profile.update(chunk)
+            # JSON Lines records may omit keys: a column absent from some rows has nulls
+            for col in dtypes.keys() - set(chunk.columns):
+                has_nulls[col] = True
+            for col in chunk.columns:
+                if col not in dtypes and rows:
+                    has_nulls[col] = True
+            rows += len(chunk)
+            for col in chunk.columns:
+                values = chunk[col]
+                nulls = values.isna()
+                has_nulls[col] = has_nulls.get(col, False) or bool(nulls.any())
+                if len(values) and nulls.all():
+                    # An all-null chunk says nothing about the column's type
+                    dtypes.setdefault(col, None)
+                    continue
+                dtypes[col] = _merge_dtypes(dtypes.get(col), values.dtype)
+
+        schema = {col: _finalize_dtype(dtype, has_nulls[col]) for col, dtype in dtypes.items()}
+        if settings.OPTIMIZE_DTYPES:
+            schema = profile.schema(schema)
+        compact_bytes = DatasetStore._convert_chunks(file_path, chunk_rows, schema, moments) if rows else 0
+
+        return {
+            "size_rows": rows,
+            "column_names": list(schema),
+            "data_types": {col: str(dtype) for col, dtype in schema.items()},
+            "column_stats": moments.statistics(),
+            "memory_bytes": {"default": default_bytes, "compact": compact_bytes}
+        }
+
+    @staticmethod
+    def _convert_chunks(file_path: str, chunk_rows: Optional[int],
+                        schema: Dict[str, Any], moments: ColumnMoments) -> int:
+        """
+        Re-read chunks with a fixed schema, feeding moments and appending
+        them to the Parquet copy
+
+        If a chunk can't be written the copy is abandoned, but the remaining
+        chunks are still read so the statistics cover the whole dataset.
+
+        Returns:
+            Total memory footprint of the chunks as read with schema
+        """
+        path = DatasetStore.columnar_path(file_path)
+        tmp_path = path + _tmp_suffix()
+        writer = None
+        failed = False
+        nbytes = 0
+        for chunk in DatasetStore.iter_raw_chunks(file_path, chunk_rows, dtype=schema):
+            chunk = _conform(chunk, schema)
+            nbytes += memory_bytes(chunk)
+            moments.update(chunk)
+            if failed:
+                continue
+            try:
+                if writer is None:
+                    arrow_schema = _arrow_schema(chunk)
+                    writer = pq.ParquetWriter(tmp_path, arrow_schema)
+                writer.write_table(pa.Table.from_pandas(chunk, schema=arrow_schema, preserve_index=False))
+            except (pa.ArrowException, TypeError, ValueError):
+                failed = True
+                if writer is not None:
+                    writer.close()
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+
+        if failed or writer is None:
+            return nbytes
+        writer.close()
+        os.replace(tmp_path, path)
+        return nbytes
+
+    @staticmethod
+    def column_statistics(file_path: str) -> Dict[str, Dict[str, float]]:
+        """Full-dataset statistics of the numeric columns, computed chunk by chunk"""
+        DatasetStore.ensure_columnar(file_path)
+        moments = ColumnMoments()
+        for chunk in DatasetStore.iter_chunks(file_path, DatasetStore.numeric_columns(file_path)):
+            moments.update(chunk)
+        return moments.statistics()
+
+    @staticmethod
+    def write_columnar(df: pd.DataFrame, file_path: str) -> Optional[str]:
+        """
+        Write a typed Parquet copy of df next to the raw file
+
+        The copy is an optimization only: if the frame cannot be represented
+        in Arrow (e.g. mixed-type object columns) nothing is written and the
+        raw file remains the source of truth.
+
+        Returns:
+            Path of the columnar copy, or None if it could not be written
+        """
+        path = DatasetStore.columnar_path(file_path)
+        tmp_path = path + _tmp_suffix()
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            return path
+        except (pa.ArrowException, TypeError, ValueError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return None
+
+    @staticmethod
+    def ensure_columnar(file_path: str) -> str:
+        """Build the columnar copy for a legacy upload if it doesn't exist yet"""
+        if not DatasetStore.has_columnar(file_path):
+            DatasetStore.ingest(file_path)
+        if not DatasetStore.has_columnar(file_path):
+            raise ValueError("Dataset could not be converted to columnar format")
+        return DatasetStore.columnar_path(file_path)
+
+    @staticmethod
+    def iter_chunks(file_path: str, columns: Optional[List[str]] = None,
+                    chunk_rows: Optional[int] = None) -> Iterator[pd.DataFrame]:
+        """
+        Stream the stored dataset as DataFrames of at most chunk_rows rows
+
+        Only the requested columns are decoded from the columnar copy.
+        """
+        parquet_file = pq.ParquetFile(DatasetStore.ensure_columnar(file_path))
+        for batch in parquet_file.iter_batches(
+            batch_size=chunk_rows or settings.INGEST_CHUNK_ROWS, columns=columns
+        ):
+            yield batch.to_pandas()
+
+    @staticmethod
+    def analysis_columns(file_path: str, extra_columns: Optional[List[str]] = None) -> List[str]:
+        """Numeric columns plus existing extra_columns, in stored order"""
+        schema_names = pq.read_schema(DatasetStore.columnar_path(file_path)).names
+        wanted = set(DatasetStore.numeric_columns(file_path)) | {col for col in (extra_columns or []) if col}
+        return [name for name in schema_names if name in wanted]
+
+    @staticmethod
+    def describe(file_path: str) -> Dict[str, Any]:
+        """Column names and pandas dtypes of the stored dataset, from the columnar schema"""
+        schema = pq.read_schema(DatasetStore.ensure_columnar(file_path))
+        dtypes = schema.empty_table().to_pandas().dtypes
+        return {
+            "column_names": schema.names,
+            "data_types": dtypes.astype(str).to_dict()
+        }
+
+    @staticmethod
+    def row_count(file_path: str) -> int:
+        """Number of rows, read from the columnar copy's footer"""
+        return pq.ParquetFile(DatasetStore.ensure_columnar(file_path)).metadata.num_rows
+
+    @staticmethod
+    def cluster_layout_paths(file_path: str, column: str) -> Tuple[str, str]:
+        """Paths of the copy sorted by column and of its cluster index"""
+        digest = hashlib.sha1(column.encode("utf-8")).hexdigest()[:16]
+        base = f"{file_path}{CLUSTER_LAYOUT_INFIX}{digest}"
+        return f"{base}.parquet", f"{base}.index.parquet"
+
+    @staticmethod
+    def cluster_index(file_path: str, column: str) -> pd.DataFrame:
+        """
+        Cluster-to-rows index of the layout partitioned by column, building
+        the layout the first time column is used
+
+        Returns:
+            DataFrame with one row per cluster key (a missing key is a
+            cluster of its own): cluster, row_start and row_count, the
+            cluster's contiguous rows in the partitioned copy
+        """
+        data_path, index_path = DatasetStore.cluster_layout_paths(file_path, column)
+        if not os.path.exists(index_path):
+            DatasetStore._build_cluster_layout(file_path, column, data_path, index_path)
+        return pd.read_parquet(index_path)
+
+    @staticmethod
+    def _build_cluster_layout(file_path: str, column: str, data_path: str, index_path: str) -> None:
+        """
+        Write the analysis columns sorted by column, with row groups that
+        never mix a cluster's rows with rows of clusters outside the group
+
+        Clusters are packed into row groups of up to CLUSTER_ROW_GROUP_ROWS
+        rows; a larger cluster gets row groups of its own. Reading a cluster
+        then touches only its row groups. The index is written last, so its
+        presence marks a complete layout.
+
+        Memory stays bounded by INGEST_CHUNK_ROWS rows, whatever the dataset
+        size: a first pass counts each cluster key's rows, then the rows are
+        spilled into buckets of consecutive keys (a pyarrow.dataset write
+        partitioned by bucket, SPILL_MAX_BUCKETS buckets per pass over the
+        columnar copy), and each bucket is sorted on its own and appended.
+        A cluster larger than a bucket is a bucket of its own and is copied
+        through without sorting.
+        """
+        DatasetStore.ensure_columnar(file_path)
+        columns = DatasetStore.analysis_columns(file_path, [column])
+        if column not in columns:
+            raise ValueError(f"Column '{column}' not found in dataset")
+
+        # pre_buffer would keep every row group read so far cached
+        source = pq.ParquetFile(DatasetStore.columnar_path(file_path), pre_buffer=False)
+        stored = source.schema_arrow
+        schema = pa.schema([stored.field(name) for name in columns], metadata=stored.metadata)
+        chunk_rows = settings.INGEST_CHUNK_ROWS
+        group_rows = settings.CLUSTER_ROW_GROUP_ROWS
+
+        clusters, sizes = _cluster_sizes(source, column, chunk_rows)
+        starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+        buckets = _cluster_buckets(sizes, chunk_rows)
+        bucket_of = np.repeat(
+            np.arange(len(buckets), dtype=np.int32), [stop - first for first, stop in buckets]
+        )
+
+        suffix = _tmp_suffix()
+        with tempfile.TemporaryDirectory(dir=os.path.dirname(data_path) or None,
+                                         prefix=".cluster-spill-") as spill_dir, \
+                pq.ParquetWriter(data_path + suffix, schema) as writer:
+            for pass_start in range(0, len(buckets), SPILL_MAX_BUCKETS):
+                spilling = range(pass_start, min(pass_start + SPILL_MAX_BUCKETS, len(buckets)))
+                pass_dir = os.path.join(spill_dir, str(pass_start))
+                ds.write_dataset(
+                    _bucketed_batches(source, columns, column, clusters, bucket_of, spilling, chunk_rows),
+                    pass_dir,
+                    schema=schema.append(pa.field(SPILL_BUCKET_COLUMN, pa.int32())),
+                    format="parquet",
+                    partitioning=ds.partitioning(pa.schema([(SPILL_BUCKET_COLUMN, pa.int32())])),
+                    max_rows_per_group=group_rows
+                )
+
+                for bucket in spilling:
+                    first, stop = buckets[bucket]
+                    spilled = ds.dataset(os.path.join(pass_dir, str(bucket)), schema=schema, format="parquet")
+                    if stop - first == 1:
+                        for batch in spilled.to_batches(batch_size=group_rows):
+                            writer.write_table(pa.Table.from_batches([batch], schema), row_group_size=len(batch))
+                        continue
+                    table = spilled.to_table()
+                    codes = _cluster_codes(table.column(column), clusters)
+                    table = table.take(pa.array(np.argsort(codes, kind='stable')))
+                    for start, length in _cluster_row_groups(sizes[first:stop], group_rows):
+                        writer.write_table(table.slice(start, length), row_group_size=length)
+                shutil.rmtree(pass_dir)
+        os.replace(data_path + suffix, data_path)
+
+        index = pd.DataFrame({"cluster": clusters.to_pandas(), "row_start": starts, "row_count": sizes})
+        index.to_parquet(index_path + suffix, index=False)
+        os.replace(index_path + suffix, index_path)
+
+    @staticmethod
+    def read_clusters(file_path: str, column: str, clusters: pd.DataFrame,
+                      columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Read the rows of the given clusters from the partitioned layout
+
+        Only the row groups holding those clusters are decoded, so the I/O
+        follows the size of the selected clusters rather than the dataset.
+
+        Args:
+            file_path: Path of the raw upload
+            column: Cluster column the layout was built for
+            clusters: Rows of cluster_index(file_path, column)
+            columns: Columns to read (default: every column of the layout)
+
+        Returns:
+            DataFrame with the clusters' rows, ordered by cluster key
+        """
+        data_path, _ = DatasetStore.cluster_layout_paths(file_path, column)
+        parquet_file = pq.ParquetFile(data_path)
+        metadata = parquet_file.metadata
+        bounds = np.cumsum([0] + [metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)])
+
+        clusters = clusters[clusters["row_count"] > 0].sort_values("row_start")
+        starts = clusters["row_start"].to_numpy(np.int64)
+        counts = clusters["row_count"].to_numpy(np.int64)
+        first = np.searchsorted(bounds, starts, side='right') - 1
+        last = np.searchsorted(bounds, starts + counts - 1, side='right') - 1
+        groups = np.unique(np.concatenate(
+            [np.arange(lo, hi + 1) for lo, hi in zip(first, last)]
+        )).astype(np.int64) if len(starts) else np.empty(0, dtype=np.int64)
+
+        table = parquet_file.read_row_groups(groups.tolist(), columns=columns)
+        if table.num_rows > counts.sum():
+            # Drop the rows of unselected clusters sharing those row groups
+            group_rows = bounds[groups + 1] - bounds[groups]
+            local = np.concatenate([[0], np.cumsum(group_rows)[:-1]])
+            shift = local[np.searchsorted(groups, first)] - bounds[first]
+            positions = np.repeat(starts + shift - np.concatenate([[0], np.cumsum(counts)[:-1]]), counts)
+            positions += np.arange(counts.sum())
+            table = table.take(pa.array(positions))
+        return table.to_pandas()
+
+    @staticmethod
+    def numeric_columns(file_path: str) -> List[str]:
+        """Numeric column names, read from the columnar schema without loading data"""
+        schema = pq.read_schema(DatasetStore.columnar_path(file_path))
+        return [
+            field.name for field in schema
+            if pa.types.is_integer(field.type) or pa.types.is_floating(field.type)
+        ]
+
+    @staticmethod
+    def load(file_path: str, columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load a dataset, preferring the columnar copy
+
+        Args:
+            file_path: Path of the raw upload
+            columns: Columns to read (default: all)
+
+        Returns:
+            DataFrame with the requested columns
+        """
+        if DatasetStore.has_columnar(file_path):
+            return pd.read_parquet(DatasetStore.columnar_path(file_path), columns=columns)
+
+        # Fallback for datasets uploaded before columnar copies existed;
+        # backfill the copy so the next load takes the fast path
+        df = DatasetStore.read_raw(file_path)
+        if settings.OPTIMIZE_DTYPES:
+            df = compact_frame(df)
+        DatasetStore.write_columnar(df, file_path)
+        if columns is not None:
+            df = df[[col for col in columns if col in df.columns]]
+        return df
+
+    @staticmethod
+    def load_for_analysis(file_path: str, extra_columns: Optional[List[str]] = None) -> pd.DataFrame:
+        """
+        Load only the columns an analysis needs: every numeric column plus
+        the stratum/cluster columns in extra_columns
+
+        Args:
+            file_path: Path of the raw upload
+            extra_columns: Additional (possibly non-numeric) columns to read
+
+        Returns:
+            DataFrame restricted to the needed columns
+        """
+        extra_columns = [col for col in (extra_columns or []) if col]
+
+        if not DatasetStore.has_columnar(file_path):
+            df = DatasetStore.load(file_path)
+            numeric = df.select_dtypes(include='number').columns.tolist()
+            wanted = set(numeric) | set(extra_columns)
+            return df[[col for col in df.columns if col in wanted]]
+
+        return DatasetStore.load(file_path, columns=DatasetStore.analysis_columns(file_path, extra_columns))
+
+
+def _tmp_suffix() -> str:
+    """Suffix of a temporary file private to this process and thread"""
+    return f".tmp-{os.getpid()}-{threading.get_ident()}"
+
+
+def _merge_dtypes(current, new):
+    """Widest dtype able to hold values of both current and new"""
+    if current is None or current == new:
+        return new
+    if (is_numeric_dtype(current) and is_numeric_dtype(new)
+            and not is_bool_dtype(current) and not is_bool_dtype(new)):
+        return np.promote_types(current, new)
+    return np.dtype(object)
+
+
+def _finalize_dtype(dtype, has_nulls: bool):
+    """Adjust a merged dtype for columns that contain missing values"""
+    if dtype is None:
+        return np.dtype('float64')
+    if has_nulls and is_integer_dtype(dtype):
+        return np.dtype('float64')
+    if has_nulls and is_bool_dtype(dtype):
+        return np.dtype(object)
+    return dtype
+
+
+def _cluster_row_groups(sizes: np.ndarray, group_rows: int) -> List[Tuple[int, int]]:
+    """
+    (start, length) row groups over clusters laid out consecutively with
+    the given sizes: consecutive clusters share a group while they fit in
+    group_rows, and a cluster larger than that is split into groups of its own
+    """
+    groups = []
+    start = length = 0
+    for size in sizes.tolist():
+        if length and length + size > group_rows:
+            groups.append((start, length))
+            start, length = start + length, 0
+        if size > group_rows:
+            for offset in range(0, size, group_rows):
+                groups.append((start + offset, min(group_rows, size - offset)))
+            start += size
+            continue
+        length += size
+    if length:
+        groups.append((start, length))
+    return groups
+
+
+def _cluster_sizes(source: pq.ParquetFile, column: str, chunk_rows: int) -> Tuple[pa.Array, np.ndarray]:
+    """
+    Distinct keys of column, sorted with the missing key last, and the
+    number of rows of each, counted chunk by chunk
+    """
+    values = pa.array([], type=_key_type(source.schema_arrow.field(column).type))
+    counts = pa.array([], type=pa.int64())
+    for batch in source.iter_batches(batch_size=chunk_rows, columns=[column]):
+        chunk_counts = pc.value_counts(_decoded(batch.column(0)))
+        totals = pa.table({
+            "key": pa.concat_arrays([values, chunk_counts.field("values")]),
+            "rows": pa.concat_arrays([counts, chunk_counts.field("counts")])
+        }).group_by("key").aggregate([("rows", "sum")])
+        values, counts = totals.column("key").combine_chunks(), totals.column("rows_sum").combine_chunks()
+    order = pc.sort_indices(values)
+    return values.take(order), counts.take(order).to_numpy().astype(np.int64)
+
+
+def _cluster_buckets(sizes: np.ndarray, bucket_rows: int) -> List[Tuple[int, int]]:
+    """
+    [first, stop) ranges of consecutive clusters holding at most
+    bucket_rows rows together; a larger cluster is a range of its own
+    """
+    buckets = []
+    first = rows = 0
+    for code, size in enumerate(sizes.tolist()):
+        if code > first and rows + size > bucket_rows:
+            buckets.append((first, code))
+            first, rows = code, 0
+        rows += size
+    if len(sizes):
+        buckets.append((first, len(sizes)))
+    return buckets
+
+
+def _bucketed_batches(source: pq.ParquetFile, columns: List[str], column: str, clusters: pa.Array,
+                      bucket_of: np.ndarray, buckets: range, chunk_rows: int) -> Iterator[pa.RecordBatch]:
+    """Rows of the analysis columns whose cluster is in one of buckets, tagged with that bucket"""
+    for batch in source.iter_batches(batch_size=chunk_rows, columns=columns):
+        bucket = bucket_of[_cluster_codes(batch.column(batch.schema.get_field_index(column)), clusters)]
+        keep = (bucket >= buckets.start) & (bucket < buckets.stop)
+        if not keep.any():
+            continue
+        mask = pa.array(keep)
+        yield pa.RecordBatch.from_arrays(
+            [values.filter(mask) for values in batch.columns] + [pa.array(bucket[keep], type=pa.int32())],
+            names=batch.schema.names + [SPILL_BUCKET_COLUMN]
+        )
+
+
+def _cluster_codes(keys, clusters: pa.Array) -> np.ndarray:
+    """Position of each key in the sorted distinct keys"""
+    return pc.index_in(_decoded(keys), value_set=clusters, skip_nulls=False).to_numpy(zero_copy_only=False)
+
+
+def _key_type(arrow_type: pa.DataType) -> pa.DataType:
+    return arrow_type.value_type if pa.types.is_dictionary(arrow_type) else arrow_type
+
+
+def _decoded(keys):
+    """keys with dictionary (categorical) encoding undone"""
+    return pc.cast(keys, keys.type.value_type) if pa.types.is_dictionary(keys.type) else keys
+
+
+def _conform(chunk: pd.DataFrame, schema: Dict[str, Any]) -> pd.DataFrame:
+    """chunk with exactly the schema's columns, in order; absent columns are all-null"""
+    if list(chunk.columns) == list(schema):
+        return chunk
+    missing = {
+        col: pd.Series(None, index=chunk.index, dtype=dtype)
+        for col, dtype in schema.items() if col not in chunk.columns
+    }
+    return chunk.assign(**missing)[list(schema)]
+
+
+def _arrow_schema(chunk: pd.DataFrame) -> pa.Schema:
+    """Arrow schema for chunk, typing all-null text columns as strings"""
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False)
+    for i, field in enumerate(schema):
+        if pa.types.is_null(field.type):
+            schema = schema.set(i, field.with_type(pa.string()))
+    return schema
@@ -0,0 +1,284 @@
+"""
+Streaming Sampling Module
+Out-of-core sampling over the stored dataset, one chunk at a time
+"""
+
+import math
+import pandas as pd
+import numpy as np
+from typing import Tuple, Dict, Any, List, Optional
+from app.core.storage import DatasetStore
+from app.core.performance import ColumnMoments, measure_resources
+from app.core.sampling import rank_within_groups
+
+
+class _Reservoir:
+    """
+    Fixed-size reservoir of rows drawn from a stream of DataFrame chunks
+
+    Slots point at rows of small "piece" frames copied out of the chunks.
+    Pieces are compacted into a single frame whenever they hold more than
+    twice the reservoir size, so memory stays O(capacity).
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.size = 0
+        self.pieces: List[pd.DataFrame] = []
+        self.piece_rows = 0
+        self.slot_piece = np.zeros(capacity, dtype=np.int64)
+        self.slot_row = np.zeros(capacity, dtype=np.int64)
+
+    def fill(self, rows: pd.DataFrame) -> None:
+        """Append rows to the empty slots"""
+        n = len(rows)
+        self._add_piece(rows)
+        self.slot_piece[self.size:self.size + n] = len(self.pieces) - 1
+        self.slot_row[self.size:self.size + n] = np.arange(n)
+        self.size += n
+
+    def replace(self, rows: pd.DataFrame, slots: np.ndarray) -> None:
+        """Overwrite slots[i] with rows.iloc[i]; later rows win on repeated slots"""
+        self._add_piece(rows)
+        self.slot_piece[slots] = len(self.pieces) - 1
+        self.slot_row[slots] = np.arange(len(rows))
+        if self.piece_rows > 2 * self.capacity:
+            self._compact()
+
+    def frame(self) -> pd.DataFrame:
+        """Materialize the reservoir in slot order"""
+        if not self.pieces:
+            return pd.DataFrame()
+        offsets = np.cumsum([0] + [len(piece) for piece in self.pieces[:-1]])
+        stacked = pd.concat(self.pieces, ignore_index=True)
+        positions = offsets[self.slot_piece[:self.size]] + self.slot_row[:self.size]
+        return stacked.take(positions).reset_index(drop=True)
+
+    def _add_piece(self, rows: pd.DataFrame) -> None:
+        self.pieces.append(rows.reset_index(drop=True))
+        self.piece_rows += len(rows)
+
+    def _compact(self) -> None:
+        current = self.frame()
+        self.pieces = [current]
+        self.piece_rows = len(current)
+        self.slot_piece[:self.size] = 0
+        self.slot_row[:self.size] = np.arange(self.size)
+
+
+class StreamingSampling:
+    """Sampling methods that stream the stored dataset instead of loading it"""
+
+    @staticmethod
+    def random_sampling(file_path: str, frac: float, total_rows: int,
+                        columns: Optional[List[str]] = None,
+                        moments: Optional[ColumnMoments] = None,
+                        random_state: int = 42) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Random Sampling with a single pass of reservoir sampling (Algorithm L)
+
+        Instead of drawing a random number per row, Algorithm L draws the
+        gap to the next row that enters the reservoir, so the work per chunk
+        is proportional to the number of replacements, not the chunk size.
+
+        Args:
+            file_path: Path of the stored dataset
+            frac: Fraction of data to sample (0-1)
+            total_rows: Number of rows in the dataset
+            columns: Columns to read (default: all)
+            moments: Optional accumulator fed every chunk, for full-dataset statistics
+            random_state: Seed for the random generator
+
+        Returns:
+            Tuple of (sampled_dataframe, metrics_dict)
+        """
+        try:
+            with measure_resources() as usage:
+                k = min(int(round(frac * total_rows)), total_rows)
+                rng = np.random.default_rng(random_state)
+                reservoir = _Reservoir(k)
+
+                # w and next_row follow Algorithm L (Li, 1994)
+                w = math.exp(math.log(1.0 - rng.random()) / k) if k else 0.0
+                next_row = k + StreamingSampling._skip(rng, w) if k else None
+                seen = 0
+
+                for chunk in DatasetStore.iter_chunks(file_path, columns):
+                    if moments is not None:
+                        moments.update(chunk)
+                    n = len(chunk)
+
+                    # The first k rows fill the reservoir directly
+                    if reservoir.size < k or not reservoir.pieces:
+                        reservoir.fill(chunk.iloc[:min(n, k - reservoir.size)])
+
+                    slots, positions = [], []
+                    while next_row is not None and next_row < seen + n:
+                        positions.append(next_row - seen)
+                        slots.append(rng.integers(k))
+                        w *= math.exp(math.log(1.0 - rng.random()) / k)
+                        next_row += 1 + StreamingSampling._skip(rng, w)
+                    if positions:
+                        reservoir.replace(chunk.iloc[positions], np.asarray(slots))
+
+                    seen += n
+
+                sampled_df = reservoir.frame()
+
+            metrics = {
+                **usage.as_metrics(),
+                "sample_size": len(sampled_df),
+                "original_size": seen,
+                "method": "Random Sampling"
+            }
+
+            return sampled_df, metrics
+        except Exception as e:
+            raise ValueError(f"Error in streaming random sampling: {str(e)}")
+
+    @staticmethod
+    def stratified_sampling(file_path: str, target_column: str, frac: float,
+                            columns: Optional[List[str]] = None,
+                            moments: Optional[ColumnMoments] = None,
+                            random_state: int = 42) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Stratified Sampling with one reservoir per stratum
+
+        A first pass reads only target_column to count each stratum and
+        derive its proportional allocation. The second pass tags every row
+        with a uniform random key and keeps, per stratum, the rows with the
+        smallest keys (a bottom-k reservoir), which is a uniform sample
+        without replacement. Rows whose key can't beat their stratum's
+        current threshold are discarded before touching the reservoir.
+
+        Args:
+            file_path: Path of the stored dataset
+            target_column: Column name to stratify on
+            frac: Fraction of data to sample from each stratum (0-1)
+            columns: Columns to read (default: all); must include target_column
+            moments: Optional accumulator fed every chunk, for full-dataset statistics
+            random_state: Seed for the random generator
+
+        Returns:
+            Tuple of (sampled_dataframe, metrics_dict)
+        """
+        try:
+            with measure_resources() as usage:
+                DatasetStore.ensure_columnar(file_path)
+                if target_column not in DatasetStore.analysis_columns(file_path, [target_column]):
+                    raise ValueError(f"Column '{target_column}' not found in dataset")
+
+                # Pass 1: stratum sizes, reading the stratum column only
+                counts = pd.Series(dtype=np.float64)
+                for chunk in DatasetStore.iter_chunks(file_path, [target_column]):
+                    counts = counts.add(chunk[target_column].value_counts(), fill_value=0)
+                counts = counts.sort_index()
+                strata = counts.index
+                quotas = np.round(min(frac, 1.0) * counts.to_numpy()).astype(np.int64)
+
+                # Pass 2: per-stratum bottom-k reservoirs over random keys
+                rng = np.random.default_rng(random_state)
+                thresholds = np.where(quotas > 0, 1.0, 0.0)
+                kept = None
+                kept_codes = np.empty(0, dtype=np.int64)
+                kept_keys = np.empty(0)
+                seen = 0
+
+                for chunk in DatasetStore.iter_chunks(file_path, columns):
+                    if moments is not None:
+                        moments.update(chunk)
+                    seen += len(chunk)
+                    if kept is None:
+                        kept = chunk.iloc[:0]
+
+                    codes = pd.Categorical(chunk[target_column], categories=strata).codes.astype(np.int64)
+                    keys = rng.random(len(chunk))
+                    candidates = (codes >= 0) & (keys < thresholds[np.maximum(codes, 0)])
+                    if not candidates.any():
+                        continue
+
+                    pool = pd.concat([kept, chunk[candidates]], ignore_index=True)
+                    pool_codes = np.concatenate([kept_codes, codes[candidates]])
+                    pool_keys = np.concatenate([kept_keys, keys[candidates]])
+
+                    order, rank = rank_within_groups(pool_codes, pool_keys)
+                    chosen = order[rank < quotas[pool_codes[order]]]
+                    kept = pool.take(chosen).reset_index(drop=True)
+                    kept_codes = pool_codes[chosen]
+                    kept_keys = pool_keys[chosen]
+
+                    # Full reservoirs only admit keys below their current largest key
+                    last = np.ones(len(chosen), dtype=bool)
+                    last[:-1] = kept_codes[1:] != kept_codes[:-1]
+                    full = np.bincount(kept_codes, minlength=len(strata)) >= quotas
+                    largest = np.ones(len(strata))
+                    largest[kept_codes[last]] = kept_keys[last]
+                    thresholds = np.where(full, np.where(quotas > 0, largest, 0.0), 1.0)
+
+                sampled_df = kept if kept is not None else pd.DataFrame()
+
+            metrics = {
+                **usage.as_metrics(),
+                "sample_size": len(sampled_df),
+                "original_size": seen,
+                "method": "Stratified Sampling"
+            }
+
+            return sampled_df, metrics
+        except Exception as e:
+            raise ValueError(f"Error in streaming stratified sampling: {str(e)}")
+
+    @staticmethod
+    def cluster_sampling(file_path: str, cluster_column: str,
+                         columns: Optional[List[str]] = None,
+                         random_state: int = 42) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """
+        Cluster Sampling over the layout partitioned by cluster_column
+
+        Half of the clusters are picked from the cluster index and only
+        their row groups are read (see DatasetStore.read_clusters), so no
+        pass over the whole dataset is made. The layout is built the first
+        time a column is used for clustering.
+
+        Args:
+            file_path: Path of the stored dataset
+            cluster_column: Column to use for creating clusters
+            columns: Columns to read (default: numeric columns plus cluster_column)
+            random_state: Seed for the cluster choice
+
+        Returns:
+            Tuple of (sampled_dataframe, metrics_dict)
+        """
+        try:
+            with measure_resources() as usage:
+                index = DatasetStore.cluster_index(file_path, cluster_column)
+                if len(index) == 0:
+                    raise ValueError("No clusters found in the specified column")
+
+                # Randomly select approximately 50% of clusters
+                chosen = np.random.RandomState(random_state).choice(
+                    len(index), size=max(1, len(index) // 2), replace=False
+                )
+                sampled_df = DatasetStore.read_clusters(
+                    file_path, cluster_column, index.iloc[chosen], columns
+                )
+
+            metrics = {
+                **usage.as_metrics(),
+                "sample_size": len(sampled_df),
+                "original_size": int(index["row_count"].sum()),
+                "method": "Cluster Sampling"
+            }
+
+            return sampled_df, metrics
+        except Exception as e:
+            raise ValueError(f"Error in streaming cluster sampling: {str(e)}")
+
+    @staticmethod
+    def _skip(rng: np.random.Generator, w: float) -> int:
+        """Number of rows to pass over before the next reservoir replacement"""
+        if w >= 1.0:
+            return 0
+        if w <= 0.0:
+            return 2 ** 62
+        return int(math.floor(math.log(1.0 - rng.random()) / math.log1p(-w)))
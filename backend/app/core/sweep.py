@@ -0,0 +1,90 @@
+"""
+Parameter Sweep Module
+Evaluates sampling methods over grids of fractions and seeds on one loaded dataset
+"""
+
+import numpy as np
+import pandas as pd
+from typing import Dict, Any, List, Optional
+from app.core.sampling import SamplingMethods
+from app.core.performance import PerformanceMetrics
+
+SWEEP_METHODS = ('random', 'stratified', 'cluster')
+
+
+def parameter_sweep(df: pd.DataFrame, methods: List[str], fractions: List[float], seeds: List[int],
+                    target_column: Optional[str] = None, cluster_column: Optional[str] = None,
+                    original_stats: Optional[Dict[str, Dict[str, float]]] = None) -> List[Dict[str, Any]]:
+    """
+    Run every method at every fraction for every seed
+
+    Each (method, seed) pair builds its shuffled ordering once and takes all
+    fractions from it (see SamplingMethods.random_sweep), so the cost of a
+    sweep grows with the number of seeds rather than with the grid size.
+    Samples are scored by position against the full-dataset statistics.
+
+    Args:
+        df: Analysis frame (numeric columns plus the stratum/cluster columns)
+        methods: Entries of SWEEP_METHODS
+        fractions: Sample fractions (0-1); for cluster sampling, the
+            fraction of clusters selected
+        seeds: Random seeds
+        target_column: Column for stratified sampling
+        cluster_column: Column for cluster sampling
+        original_stats: Full-dataset column statistics (see ColumnMoments.statistics)
+
+    Returns:
+        One entry per run with method, sample_fraction (as requested),
+        effective_fraction (rows sampled / rows), seed, metrics and accuracy,
+        ordered by method, fraction and seed
+    """
+    runs = []
+    for method in methods:
+        for seed in seeds:
+            if method == 'random':
+                samples = SamplingMethods.random_sweep(df, fractions, random_state=seed)
+            elif method == 'stratified':
+                samples = SamplingMethods.stratified_sweep(df, target_column, fractions, random_state=seed)
+            else:
+                samples = SamplingMethods.cluster_sweep(df, cluster_column, fractions, random_state=seed)
+
+            for frac, (positions, metrics) in samples.items():
+                runs.append({
+                    "method": method,
+                    "sample_fraction": frac,
+                    "effective_fraction": len(positions) / len(df) if len(df) else 0.0,
+                    "seed": seed,
+                    "metrics": metrics,
+                    "accuracy": PerformanceMetrics.calculate_accuracy_metrics(
+                        df, None, original_stats=original_stats, sample_positions=positions
+                    )
+                })
+
+    order = {method: i for i, method in enumerate(methods)}
+    runs.sort(key=lambda run: (order[run["method"]], run["sample_fraction"], seeds.index(run["seed"])))
+    return runs
+
+
+def summarize_sweep(runs: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Aggregate sweep runs over seeds: one row per (method, fraction) with the
+    mean and spread of accuracy and the mean cost
+    """
+    groups: Dict[tuple, List[Dict[str, Any]]] = {}
+    for run in runs:
+        groups.setdefault((run["method"], run["sample_fraction"]), []).append(run)
+
+    summary = []
+    for (method, frac), group in groups.items():
+        accuracy = np.array([run["accuracy"]["accuracy_percentage"] for run in group], dtype=float)
+        summary.append({
+            "method": group[0]["metrics"]["method"],
+            "sample_fraction": frac,
+            "runs": len(group),
+            "mean_sample_size": float(np.mean([run["metrics"]["sample_size"] for run in group])),
+            "mean_accuracy": round(float(accuracy.mean()), 2),
+            "accuracy_std": round(float(accuracy.std()), 4),
+            "min_accuracy": round(float(accuracy.min()), 2),
+            "mean_execution_time": round(float(np.mean([run["metrics"]["execution_time"] for run in group])), 4)
+        })
+    return summary
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean
+from sqlalchemy import Column, Integer, String, Float, DateTime, ForeignKey, Text, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from app.core.database import Base
@@ -26,12 +26,31 @@ class Dataset(Base):
     file_path = Column(Text, nullable=False)
     size_rows = Column(Integer, nullable=False)
     size_mb = Column(Float, nullable=False)
+    content_hash = Column(String(64), nullable=True, index=True)  # SHA-256 of the raw upload
     upload_date = Column(DateTime, default=datetime.utcnow)
     description = Column(Text, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="datasets")
     experiments = relationship("Experiment", back_populates="dataset")
+    column_statistics = relationship("ColumnStatistic", back_populates="dataset")
+
+class ColumnStatistic(Base):
+    """Full-dataset statistics of a numeric column, computed once at upload"""
+    __tablename__ = "column_statistics"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    dataset_id = Column(Integer, ForeignKey("datasets.id"), nullable=False, index=True)
+    column_name = Column(String(255), nullable=False)
+    count = Column(Integer, nullable=False)        # non-null values
+    null_count = Column(Integer, nullable=False)
+    mean = Column(Float, nullable=True)
+    variance = Column(Float, nullable=True)        # sample variance (ddof=1)
+    min_value = Column(Float, nullable=True)
+    max_value = Column(Float, nullable=True)
+    
+    # Relationships
+    dataset = relationship("Dataset", back_populates="column_statistics")
 
 class SamplingMethod(Base):
     """Sampling method model"""
@@ -65,13 +84,18 @@ class Experiment(Base):
     dataset = relationship("Dataset", back_populates="experiments")
     sampling_method = relationship("SamplingMethod", back_populates="experiments")
     accuracy_results = relationship("AccuracyResult", back_populates="experiment")
+    
+    # Per-dataset listings and aggregates, optionally narrowed by method
+    __table_args__ = (
+        Index("ix_experiments_dataset_id_method_id", "dataset_id", "method_id"),
+    )
 
 class AccuracyResult(Base):
     """Accuracy metrics for each experiment"""
     __tablename__ = "accuracy_results"
     
     id = Column(Integer, primary_key=True, index=True)
-    experiment_id = Column(Integer, ForeignKey("experiments.id"), nullable=False)
+    experiment_id = Column(Integer, ForeignKey("experiments.id"), nullable=False, index=True)
     original_mean = Column(Float, nullable=False)
     sample_mean = Column(Float, nullable=False)
     error_margin = Column(Float, nullable=False)
@@ -3,6 +3,10 @@ from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 import os
 from app.core.config import settings
+from app.core.jobs import job_manager
+from app.core import parallel, spark
+from app.core.pagination import NEXT_CURSOR_HEADER
+from app.core.results import RESULT_CACHE_HEADER
 from app.api import analysis, datasets
 
 # Initialize FastAPI app
@@ -19,12 +23,20 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=[NEXT_CURSOR_HEADER, RESULT_CACHE_HEADER],
 )
 
 # Include API routers
 app.include_router(analysis.router, prefix="/api/analysis", tags=["Analysis"])
 app.include_router(datasets.router, prefix="/api/datasets", tags=["Datasets"])
 
+# Stop background worker pools and the Spark session with the server
+@app.on_event("shutdown")
+async def shutdown_job_manager():
+    job_manager.shutdown()
+    parallel.shutdown()
+    spark.shutdown()
+
 # Root endpoint
 @app.get("/")
 async def root():
@@ -197,7 +197,7 @@ export default function Analysis({ setCurrentPage }: AnalysisProps) {
                       <Input
                         id="file"
                         type="file"
-                        accept=".csv,.xlsx,.json"
+                        accept=".csv,.xlsx,.json,.jsonl,.ndjson"
                         onChange={handleFileChange}
                         disabled={analyzing}
                         className="max-w-xs mx-auto"
@@ -212,7 +212,7 @@ export default function Analysis({ setCurrentPage }: AnalysisProps) {
                         </div>
                       )}
                     </div>
-                    <p className="text-sm text-gray-500">Supported formats: CSV, XLSX, JSON</p>
+                    <p className="text-sm text-gray-500">Supported formats: CSV, XLSX, JSON, JSON Lines</p>
                   </div>
 
                   {analyzing && (